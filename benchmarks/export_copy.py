@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+"""Benchmark for copying files during jobrunner export
+
+Creates files of mixed sizes and copies them to a destination directory
+one at a time with shutil.copy, as export used to, and with CopyFiles
+with and without checksums. Use --dest on another filesystem to measure
+copies to a project filesystem
+
+    python3 benchmarks/export_copy.py --files 8 --size 256 --jobs 4
+"""
+
+# Standard libraries
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# local imports
+from jobrunner import lib
+
+
+def Measure(function, destdir):
+    """
+    Call function with an empty destination directory and return wall time
+    """
+    shutil.rmtree(destdir, ignore_errors=True)
+    os.makedirs(destdir)
+
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--size", type=int, default=256, help="largest file in MB")
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--dest", type=str, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sourcedir = tmpdir + os.sep + "source"
+        destdir = (args.dest or tmpdir) + os.sep + "export"
+        os.makedirs(sourcedir)
+
+        # file sizes halve from the largest file
+        file_list = []
+        for index in range(args.files):
+            filename = sourcedir + os.sep + f"file{index}.h5"
+            with open(filename, "wb") as datafile:
+                datafile.write(os.urandom(max(args.size >> index, 1) << 20))
+            file_list.append(filename)
+
+        total = sum(os.stat(filename).st_size for filename in file_list) / (1 << 20)
+
+        copy_list = [
+            (filename, destdir + os.sep + os.path.basename(filename), False)
+            for filename in file_list
+        ]
+
+        runs = {
+            "shutil.copy": lambda: [
+                shutil.copy(source, dest) for source, dest, move in copy_list
+            ],
+            "CopyFiles": lambda: lib.CopyFiles(copy_list, args.jobs),
+            "CopyFiles sha256": lambda: lib.CopyFiles(copy_list, args.jobs, "sha256"),
+        }
+
+        timings = {name: Measure(function, destdir) for name, function in runs.items()}
+
+        shutil.rmtree(destdir, ignore_errors=True)
+
+        print(f"\nfiles: {args.files}, total: {total:.1f} MB, jobs: {args.jobs}")
+        for name, elapsed in timings.items():
+            print(f"{name:>18}: {elapsed:8.3f} s {total / elapsed:10.1f} MB/s")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+"""Micro-benchmark for Jobfile parser backends
+
+Parses Jobfiles from the tests directory with every available backend
+and with the legacy approach of trying toml before falling back to
+yaml. Each Jobfile is also converted to toml format to compare toml
+backends on the same contents
+
+    python3 benchmarks/jobfile_backends.py --repeat 2000
+"""
+
+# Standard libraries
+import os
+import sys
+import glob
+import time
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Feature libraries
+import toml
+import yaml
+
+# local imports
+from jobrunner import lib
+from jobrunner.lib import _parsetools
+
+
+def LegacyRead(jobfile):
+    """
+    Read Jobfile by trying toml first and yaml on failure
+    """
+    try:
+        return toml.load(jobfile)
+    except:
+        with open(jobfile, "r") as stream:
+            return yaml.load(stream, Loader=getattr(_parsetools, "__YamlLoader"))
+
+
+def Measure(read, jobfile_list, repeat):
+    """
+    Return time in microseconds per Jobfile
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for jobfile in jobfile_list:
+            read(jobfile)
+    return (time.perf_counter() - start) / (repeat * len(jobfile_list)) * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    testdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests")
+    yaml_list = sorted(glob.glob(testdir + "/**/Jobfile", recursive=True))
+
+    read = getattr(_parsetools, "__ReadJobfile")
+    available = lib.GetJobfileBackend()["available"]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+
+        # create toml versions of yaml Jobfiles
+        toml_list = []
+        for index, jobfile in enumerate(yaml_list):
+            toml_list.append(tmpdir + os.sep + f"Jobfile{index}")
+            with open(toml_list[-1], "w") as stream:
+                toml.dump(read(jobfile), stream)
+
+        print(f"Jobfiles: {len(yaml_list)}, repeat: {args.repeat}")
+        print(f"{'format':>6} {'backend':>10} {'us/file':>10}")
+
+        for fmt, jobfile_list in [("yaml", yaml_list), ("toml", toml_list)]:
+            print(
+                f"{fmt:>6} {'legacy':>10} "
+                + f"{Measure(LegacyRead, jobfile_list, args.repeat):10.1f}"
+            )
+
+            for backend in available[fmt]:
+                lib.SetJobfileBackend(**{f"{fmt}_backend": backend})
+                print(
+                    f"{fmt:>6} {backend:>10} "
+                    + f"{Measure(read, jobfile_list, args.repeat):10.1f}"
+                )
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+"""Benchmark for concurrent execution of jobs with --jobs
+
+Replicates tests/Simple-Project with a number of copies of JobObject,
+adds a sleep to the submit script to emulate work, and runs submit
+with one worker and with a pool of workers
+
+    python3 benchmarks/parallel_submit.py --copies 16 --jobs 8 --sleep 1
+"""
+
+# Standard libraries
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# local imports
+from jobrunner import api
+
+
+def CreateProject(basedir, copies, sleep):
+    """
+    Replicate JobObject in Simple-Project and return list of copies
+    """
+    source = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "tests", "Simple-Project"
+    )
+
+    shutil.copytree(source, basedir, dirs_exist_ok=True)
+
+    dirlist = []
+    for index in range(copies):
+        dirlist.append(f"JobObject{index}")
+        shutil.copytree(basedir + os.sep + "JobObject", basedir + os.sep + dirlist[-1])
+
+        with open(
+            basedir + os.sep + dirlist[-1] + os.sep + "submitScript.sh", "a"
+        ) as script:
+            script.write(f"\nsleep {sleep}\n")
+
+    return dirlist
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--copies", type=int, default=16)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--sleep", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        basedir = os.path.realpath(tmpdir)
+        dirlist = CreateProject(basedir, args.copies, args.sleep)
+
+        cwd = os.getcwd()
+        os.chdir(basedir)
+
+        # progress bar keeps a reference to the output stream
+        # so a single stream is used for all runs
+        devnull = open(os.devnull, "w")
+
+        try:
+            print(f"copies: {args.copies}, sleep: {args.sleep} s")
+            for jobs in [1, args.jobs]:
+                with contextlib.redirect_stdout(devnull):
+                    start = time.perf_counter()
+                    api.submit(dirlist, jobs=jobs)
+                    elapsed = time.perf_counter() - start
+
+                print(f"jobs: {jobs:>4} {elapsed:8.2f} s")
+
+        finally:
+            devnull.close()
+            os.chdir(cwd)
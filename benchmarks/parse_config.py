@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+"""Benchmark for resolving Jobfiles across a wide directory tree
+
+Creates a campaign with a root Jobfile, a number of study nodes and
+a number of leaves per study and resolves the configuration of every
+leaf with and without a shared cache. The number of Jobfile parses is
+reported for both cases
+
+    python3 benchmarks/parse_config.py --studies 4 --leaves 500
+"""
+
+# Standard libraries
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# local imports
+from jobrunner import lib
+from jobrunner.lib import _parsetools
+
+
+def CreateTree(basedir, studies, leaves):
+    """
+    Create a directory tree with Jobfiles at every node
+    and return the list of leaf directories
+    """
+    with open(basedir + os.sep + "Jobfile", "w") as jobfile:
+        jobfile.write("schedular:\n  command: bash\n")
+        jobfile.write("job:\n  setup:\n    - environment.sh\n")
+        jobfile.write("  submit:\n    - environment.sh\n")
+
+    leaf_list = []
+
+    for study in range(studies):
+        studydir = basedir + os.sep + f"study{study}"
+        os.makedirs(studydir)
+
+        with open(studydir + os.sep + "Jobfile", "w") as jobfile:
+            jobfile.write("job:\n  setup:\n    - setup.sh\n")
+            jobfile.write("  submit:\n    - run.sh\n")
+
+        for leaf in range(leaves):
+            leafdir = studydir + os.sep + f"leaf{leaf}"
+            os.makedirs(leafdir)
+
+            with open(leafdir + os.sep + "Jobfile", "w") as jobfile:
+                jobfile.write("job:\n  input:\n    - case.toml\n")
+
+            leaf_list.append(leafdir)
+
+    return leaf_list
+
+
+def Resolve(basedir, leaf_list, shared):
+    """
+    Resolve configuration for every leaf and return
+    the number of Jobfile parses and elapsed time
+    """
+    read_jobfile = getattr(_parsetools, "__ReadJobfile")
+    counter = [0]
+
+    def CountingReader(jobfile):
+        counter[0] += 1
+        return read_jobfile(jobfile)
+
+    setattr(_parsetools, "__ReadJobfile", CountingReader)
+
+    # bypass the on-disk cache to measure parses during a single invocation
+    load_cache, save_cache = lib.LoadJobfileCache, lib.SaveJobfileCache
+    lib.LoadJobfileCache = lambda *args: None
+    lib.SaveJobfileCache = lambda *args: None
+
+    try:
+        cache = {}
+        start = time.perf_counter()
+        for leafdir in leaf_list:
+            _parsetools.ParseJobConfig(basedir, leafdir, cache if shared else None)
+        elapsed = time.perf_counter() - start
+
+    finally:
+        setattr(_parsetools, "__ReadJobfile", read_jobfile)
+        lib.LoadJobfileCache, lib.SaveJobfileCache = load_cache, save_cache
+
+    return counter[0], elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--studies", type=int, default=4)
+    parser.add_argument("--leaves", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        basedir = os.path.realpath(tmpdir)
+        leaf_list = CreateTree(basedir, args.studies, args.leaves)
+        nodes = 1 + args.studies + len(leaf_list)
+
+        print(f"nodes: {nodes}, leaves: {len(leaf_list)}")
+        for shared in [False, True]:
+            parses, elapsed = Resolve(basedir, leaf_list, shared)
+            print(
+                f"{'shared cache' if shared else 'no cache':>12}: "
+                + f"{parses:>6} parses {elapsed:8.3f} s"
+            )
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+"""Benchmark for CPU time used by jobrunner while waiting on a job
+
+Runs a bash script that sleeps for a number of seconds through
+BashProcess and BashProcessPool and measures CPU time consumed by
+the supervising interpreter. Run from a terminal to include the
+cost of the spinner, or under a pseudo-terminal with script when
+output is not a terminal. Exits with a non-zero status if CPU time
+exceeds the given fraction of the wall time
+
+    python3 benchmarks/supervisor_cpu.py --duration 10 --threshold 0.01
+    script -qec "python3 benchmarks/supervisor_cpu.py" /dev/null
+"""
+
+# Standard libraries
+import os
+import sys
+import time
+import resource
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# local imports
+from jobrunner import lib
+
+
+def Measure(function):
+    """
+    Call function and return wall time and CPU time of this process
+    """
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+
+    function()
+
+    elapsed = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    cputime = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+    return elapsed, cputime
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--threshold", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workdir = os.path.realpath(tmpdir)
+
+        with open(workdir + os.sep + "job.submit", "w") as script:
+            script.write(f"#!/bin/bash\nsleep {args.duration}\n")
+
+        runs = {
+            "BashProcess": lambda: lib.BashProcess(workdir, workdir, "job.submit"),
+            "BashProcessPool": lambda: lib.BashProcessPool(
+                workdir, [workdir], "job.submit", 1
+            ),
+        }
+
+        failed = False
+
+        print(
+            f"duration: {args.duration} s, threshold: {args.threshold:.1%}, "
+            + f"spinner: {'on' if sys.stdout.isatty() else 'off'}"
+        )
+        for name, function in runs.items():
+            elapsed, cputime = Measure(function)
+
+            fraction = cputime / elapsed
+            failed = failed or fraction > args.threshold
+
+            print(
+                f"{name:>16}: {elapsed:8.2f} s wall {cputime:8.3f} s cpu "
+                + f"{fraction:8.2%}"
+            )
+
+    sys.exit(1 if failed else 0)
@@ -2,6 +2,7 @@
 
 # Standard libraries
 import os
+import csv
 from datetime import date
 
 from jobrunner import lib
@@ -11,82 +12,305 @@ if options.INSTRUMENTS == 1:
     from jobrunner import instruments
 
 
-def setup(dirlist, verbose=False, exit_on_failure=False):
+def setup(
+    dirlist,
+    verbose=False,
+    exit_on_failure=False,
+    force_regenerate=False,
+    jobs=1,
+    dag=False,
+    skip_unchanged=False,
+    live=False,
+    run_id=None,
+):
     """
     Run setup scripts in a directory
     """
     # get base directory
     basedir = os.getcwd()
 
+    # create a cache to resolve Jobfiles along the
+    # directory tree only once for the whole dirlist
+    cache = {}
+
+    # resolve working directories and parse main dictionary for each
+    workdir_list = [__GetWorkDir(basedir, workdir) for workdir in dirlist]
+
+    if dag:
+        workdir_list = list(dict.fromkeys(workdir_list))
+
+    config_list = []
+    for workdir in workdir_list:
+        with lib.ProfilePhase("parse", workdir):
+            config_list.append(lib.ParseJobConfig(basedir, workdir, cache))
+
+    # group leading setup scripts shared by working directories into
+    # steps that run once, processes for steps are listed first
+    if dag:
+        with lib.ProfilePhase("dag"):
+            step_list, leaf_dict = lib.CreateSetupDag(basedir, config_list)
+        process_list = [(stepdir, "job.setup", parent) for stepdir, parent in step_list]
+
+    # journal of state transitions for the run, continued if
+    # run_id of an interrupted run is given
+    journal = lib.RunJournal(
+        basedir,
+        run_id,
+        "setup",
+        dict(
+            verbose=verbose,
+            exit_on_failure=exit_on_failure,
+            force_regenerate=force_regenerate,
+            jobs=jobs,
+            dag=dag,
+            skip_unchanged=skip_unchanged,
+            live=live,
+        ),
+        workdir_list,
+    )
+    print(f"{lib.Color.purple}RUN:{lib.Color.end} {journal.runid}")
+
     # set variable to determine console separator
-    separator = False
+    separator = True
 
-    # loop over dirlist
-    for workdir in dirlist:
+    # list of working directories to run using a pool of workers
+    # and wall-clock limits of working directories
+    pool_list = []
+    timeout_dict = {}
+
+    # fingerprints of jobs to record when they succeed
+    fingerprint_dict = {}
+
+    def RecordState(workdir, state):
+        """
+        Record state of a working directory in the journal, and
+        its fingerprint when it succeeds
+        """
+        if workdir in fingerprint_dict:
+            journal.Record(workdir, state)
+
+            if state == "succeeded":
+                lib.UpdateFingerprint(workdir, "job.setup", fingerprint_dict[workdir])
+
+    # loop over working directories
+    for workdir, config in zip(workdir_list, config_list):
 
         # add separator to improve output readiblity
         if separator:
             lib.ConsoleSeparator()
 
-        # chdir to working directory and display tree
-        os.chdir(workdir)
-        workdir = os.getcwd()
+        # display tree
         lib.DisplayTree(basedir, workdir)
 
-        # parse main dictionary
-        config = lib.ParseJobConfig(basedir, workdir)
+        # first script and environment after the shared steps
+        start, envfile, parent = leaf_dict[workdir] if dag else (0, None, None)
 
         # create setup file and display configuration
-        lib.CreateSetupFile(config)
+        with lib.ProfilePhase("compose", workdir):
+            lib.CreateSetupFile(config, force_regenerate, start, envfile)
         print(f"\n{lib.Color.purple}SCRIPTS: {lib.Color.end}")
-        for value in config.job.setup:
+        for index, value in enumerate(config.job.setup):
             if value:
-                print(f'{" "*4}- {value.replace(basedir,"<ROOT>")}')
+                print(
+                    f'{" "*4}- {value.replace(basedir,"<ROOT>")}'
+                    + (" (shared)" if index < start else "")
+                )
 
-        # run a bash process
-        lib.BashProcess(basedir, workdir, "job.setup", verbose, exit_on_failure)
+        # wall-clock limit of the bash process
+        if config.schedular.timeout:
+            timeout_dict[workdir] = config.schedular.timeout
+
+        # skip jobs that succeeded with an identical fingerprint
+        with lib.ProfilePhase("fingerprint", workdir):
+            fingerprint_dict[workdir] = lib.GetJobFingerprint(config, "job.setup")
+        RecordState(workdir, "composed")
+
+        if skip_unchanged and lib.CheckFingerprint(
+            workdir, "job.setup", fingerprint_dict[workdir]
+        ):
+            print(f"\n{lib.Color.purple}UNCHANGED:{lib.Color.end} skipping job.setup")
+            RecordState(workdir, "unchanged")
+
+        # run a bash process or defer it to the pool of workers
+        elif dag:
+            process_list.append((workdir, "job.setup", parent))
+        elif jobs > 1 or live:
+            pool_list.append(workdir)
+        else:
+            RecordState(workdir, "started")
+            try:
+                with lib.ProfilePhase("execute", workdir):
+                    returncode = lib.BashProcess(
+                        basedir,
+                        workdir,
+                        "job.setup",
+                        verbose,
+                        exit_on_failure,
+                        timeout_dict.get(workdir),
+                    )
+            except KeyboardInterrupt:
+                RecordState(workdir, "cancelled")
+                raise
+            RecordState(workdir, "succeeded" if returncode == 0 else "failed")
 
         # set separator value
         separator = True
 
-        # Return to base directory
-        os.chdir(basedir)
-
-
-def submit(dirlist, verbose=False, exit_on_failure=False):
+    # run shared steps and working directories in order of dependencies,
+    # steps are dropped when all working directories below are skipped
+    if dag:
+        process_list, step_count = __PruneSteps(process_list, len(step_list))
+
+    if dag and process_list:
+        lib.ConsoleSeparator()
+        print(f"{lib.Color.purple}STEPS:{lib.Color.end}")
+        for stepdir, script, parent in process_list[:step_count]:
+            print(f'{" "*4}- {stepdir.replace(basedir,"<ROOT>")}/job.setup')
+
+        lib.BashProcessDag(
+            basedir,
+            process_list,
+            jobs,
+            verbose,
+            exit_on_failure,
+            on_state=RecordState,
+            live=live,
+            timeout_dict=timeout_dict,
+        )
+
+    # run deferred bash processes concurrently
+    if pool_list:
+        lib.ConsoleSeparator()
+        lib.BashProcessPool(
+            basedir,
+            pool_list,
+            "job.setup",
+            jobs,
+            verbose,
+            exit_on_failure,
+            on_state=RecordState,
+            live=live,
+            timeout_dict=timeout_dict,
+        )
+
+    journal.Close()
+
+
+def submit(
+    dirlist,
+    verbose=False,
+    exit_on_failure=False,
+    force_regenerate=False,
+    jobs=1,
+    array=False,
+    array_size=1000,
+    max_inflight=None,
+    pack=False,
+    skip_unchanged=False,
+    live=False,
+    run_id=None,
+):
     """
     Submit a job from a directory
     """
     # get base directory
     basedir = os.getcwd()
 
+    # create a cache to resolve Jobfiles along the
+    # directory tree only once for the whole dirlist
+    cache = {}
+
+    # resolve working directories
+    workdir_list = [__GetWorkDir(basedir, workdir) for workdir in dirlist]
+
+    # journal of state transitions for the run, continued if
+    # run_id of an interrupted run is given
+    journal = lib.RunJournal(
+        basedir,
+        run_id,
+        "submit",
+        dict(
+            verbose=verbose,
+            exit_on_failure=exit_on_failure,
+            force_regenerate=force_regenerate,
+            jobs=jobs,
+            array=array,
+            array_size=array_size,
+            max_inflight=max_inflight,
+            pack=pack,
+            skip_unchanged=skip_unchanged,
+            live=live,
+        ),
+        workdir_list,
+    )
+    print(f"{lib.Color.purple}RUN:{lib.Color.end} {journal.runid}")
+
     # set variable to determine console separator
-    separator = False
+    separator = True
 
-    # loop over dirlist
-    for workdir in dirlist:
+    # list of working directories to run using a pool of workers,
+    # resources requested by each when packing onto local resources
+    # and wall-clock limits of working directories
+    pool_list = []
+    resource_list = []
+    timeout_dict = {}
+
+    # backend to run bash processes one at a time
+    bash_backend = lib.BashBackend("bash", verbose, exit_on_failure, timeout_dict)
+
+    # working directories to submit using a schedular grouped by
+    # schedular command, backend and limit on jobs in flight
+    schedular_dict = {}
+
+    # fingerprints of jobs to record when they succeed, outcome of
+    # jobs submitted to a schedular is not known to jobrunner
+    fingerprint_dict = {}
+
+    # working directories that are members of each array job
+    member_dict = {}
+
+    def RecordState(workdir, state):
+        """
+        Record state of a working directory in the journal, and
+        its fingerprint when it succeeds
+        """
+        journal.Record(workdir, state)
+
+        if state == "succeeded":
+            lib.UpdateFingerprint(workdir, "job.submit", fingerprint_dict[workdir])
+
+    def RecordSubmission(workdir, jobid):
+        """
+        Record job ID of a submission for its working directories
+        """
+        for member in member_dict.get(workdir, [workdir]):
+            journal.Record(member, "submitted", jobid)
+
+    # loop over working directories
+    for workdir in workdir_list:
 
         # add separator to improve output readiblity
         if separator:
             lib.ConsoleSeparator()
 
-        # chdir to working directory and display tree
-        os.chdir(workdir)
-        workdir = os.getcwd()
+        # display tree
         lib.DisplayTree(basedir, workdir)
 
         # parse main dictionary
-        config = lib.ParseJobConfig(basedir, workdir)
+        with lib.ProfilePhase("parse", workdir):
+            config = lib.ParseJobConfig(basedir, workdir, cache)
 
         # Build inputfile
-        lib.CreateInputFile(config)
+        with lib.ProfilePhase("input", workdir):
+            lib.CreateInputFile(config, force_regenerate)
         if config.job.input:
             print(f"\n{lib.Color.purple}INPUT: {lib.Color.end}")
             for value in config.job.input:
                 print(f'{" "*4}- {value.replace(basedir,"<ROOT>")}')
 
         # Build targetfile
-        lib.CreateTargetFile(config)
+        with lib.ProfilePhase("target", workdir):
+            lib.CreateTargetFile(config)
         if config.job.target:
             print(
                 f"\n{lib.Color.purple}TARGET:{lib.Color.end} "
@@ -94,11 +318,29 @@ def submit(dirlist, verbose=False, exit_on_failure=False):
             )
 
         # Build submitfile
-        lib.CreateSubmitFile(config)
+        with lib.ProfilePhase("compose", workdir):
+            lib.CreateSubmitFile(config, force_regenerate)
         print(f"\n{lib.Color.purple}SCRIPTS: {lib.Color.end}")
         for value in config.job.submit:
             print(f'{" "*4}- {value.replace(basedir,"<ROOT>")}')
 
+        # wall-clock limit of bash processes
+        if config.schedular.timeout:
+            timeout_dict[workdir] = config.schedular.timeout
+
+        # Skip jobs that succeeded with an identical fingerprint
+        with lib.ProfilePhase("fingerprint", workdir):
+            fingerprint_dict[workdir] = lib.GetJobFingerprint(config, "job.submit")
+        RecordState(workdir, "composed")
+
+        if skip_unchanged and lib.CheckFingerprint(
+            workdir, "job.submit", fingerprint_dict[workdir]
+        ):
+            print(f"\n{lib.Color.purple}UNCHANGED:{lib.Color.end} skipping job.submit")
+            RecordState(workdir, "unchanged")
+            separator = True
+            continue
+
         # Instrument specific work
         if options.INSTRUMENTS == 1 and config.instrument:
             if config.instrument in instruments.Run:
@@ -106,7 +348,8 @@ def submit(dirlist, verbose=False, exit_on_failure=False):
                     f"\n{lib.Color.purple}INSTRUMENT:{lib.Color.end} "
                     + f"{config.instrument}"
                 )
-                instruments.Run[config.instrument](config)
+                with lib.ProfilePhase("instrument", workdir):
+                    instruments.Run[config.instrument](config)
 
             else:
                 raise ValueError(
@@ -114,94 +357,180 @@ def submit(dirlist, verbose=False, exit_on_failure=False):
                     + f"available instruments {list(instruments.Run.keys())}"
                 )
 
-        # Submit job
-        if config.schedular.command == "bash":
-            lib.BashProcess(basedir, workdir, "job.submit", verbose, exit_on_failure)
+        # get backend of the schedular command
+        backend = lib.GetSchedularBackend(
+            config.schedular.command, config.schedular.backend
+        )
 
-        else:
-            lib.SchedularProcess(
-                basedir, workdir, config.schedular.command, "job.submit"
+        # Submit job, bash processes are deferred to the pool of workers
+        if backend.name == "bash" and pack:
+            if config.schedular.gpus:
+                raise ValueError(
+                    f"[jobrunner] schedular.gpus should be 0 for local execution, "
+                    + "GPUs are not managed by jobrunner"
+                )
+
+            pool_list.append(workdir)
+            resource_list.append(
+                (config.schedular.cores or 1, config.schedular.memory or 0)
             )
 
+        elif backend.name == "bash" and (jobs > 1 or live):
+            pool_list.append(workdir)
+
+        elif backend.name == "bash":
+            RecordState(workdir, "started")
+            try:
+                with lib.ProfilePhase("execute", workdir):
+                    bash_backend.Submit(basedir, workdir, "job.submit")
+            except KeyboardInterrupt:
+                RecordState(workdir, "cancelled")
+                raise
+            RecordState(
+                workdir, "succeeded" if bash_backend.returncode == 0 else "failed"
+            )
+
+        # defer submission to the schedular queue
+        else:
+            schedular_dict.setdefault(
+                (
+                    config.schedular.command,
+                    config.schedular.backend,
+                    max_inflight or config.schedular.max_inflight,
+                ),
+                [],
+            ).append((workdir, tuple(config.schedular.options)))
+
         # set separator value
         separator = True
 
-        # Return to base directory
-        os.chdir(basedir)
+    # run deferred bash processes concurrently
+    if pool_list:
+        lib.ConsoleSeparator()
+        lib.BashProcessPool(
+            basedir,
+            pool_list,
+            "job.submit",
+            jobs,
+            verbose,
+            exit_on_failure,
+            resource_list if pack else None,
+            RecordState,
+            live,
+            timeout_dict,
+        )
+
+    # submit jobs for each schedular, working directories with identical
+    # schedular options are grouped into array jobs if requested
+    for (command, backend_name, limit), member_list in schedular_dict.items():
+        backend = lib.GetSchedularBackend(command, backend_name)
+
+        if not array:
+            submission_list = [(workdir, "job.submit", 1) for workdir, _ in member_list]
+
+        else:
+            submission_list = __GetArraySubmissions(
+                basedir,
+                backend,
+                member_list,
+                min(array_size, limit or array_size),
+                member_dict,
+            )
+
+        lib.ConsoleSeparator()
+        lib.SchedularQueue(basedir, backend, submission_list, limit, RecordSubmission)
 
+    journal.Close()
 
-def clean(dirlist):
+
+def clean(dirlist, jobs=1):
     """
     Remove artifacts from a directory
     """
     # get base directory
     basedir = os.getcwd()
 
+    # create a cache to resolve Jobfiles along the
+    # directory tree only once for the whole dirlist
+    cache = {}
+
     # print root directory
     print(f"{lib.Color.purple}ROOT:{lib.Color.end} {basedir}")
     print(f"\n{lib.Color.purple}CLEAN:{lib.Color.end}")
 
-    # run cleanup
+    # list of arguments for each working directory
+    args_list = []
+
+    # resolve configuration for each working directory once
     for workdir in dirlist:
 
-        # chdir to working directory and display tree
-        os.chdir(workdir)
-        workdir = os.getcwd()
+        # resolve working directory
+        workdir = __GetWorkDir(basedir, workdir)
+
+        if workdir in [args[1] for args in args_list]:
+            continue
 
         # parse main dictionary
-        config = lib.ParseJobConfig(basedir, workdir)
+        with lib.ProfilePhase("parse", workdir):
+            config = lib.ParseJobConfig(basedir, workdir, cache)
 
-        # clean the directory
+        # print directory that will be cleaned
         print(f'{" "*4}- {workdir.replace(basedir,"<ROOT>")}')
-        lib.RemoveNodeFiles(config, workdir)
+        args_list.append((config, workdir))
 
-        os.chdir(basedir)
+    # clean the directories
+    lib.FunctionPool(lib.RemoveNodeFiles, args_list, jobs)
 
 
-def archive(tag, dirlist):
+def archive(tag, dirlist, jobs=1):
     """
     Create an archive along a directory tree
     """
     # get base directory
     basedir = os.getcwd()
 
+    # create a cache to resolve Jobfiles along the
+    # directory tree only once for the whole dirlist
+    cache = {}
+
     # print root directory
     print(f"{lib.Color.purple}ROOT:{lib.Color.end} {basedir}")
     print(f"\n{lib.Color.purple}ARCHIVE:{lib.Color.end}")
 
-    archive_list = []
+    # list of arguments for each working directory
+    args_list = []
+
+    # node directories claimed by a working directory, nodes shared by
+    # working directories are archived once using the first claim
+    claimed = set()
 
     # loop over dirlist
     for workdir in dirlist:
 
-        # chdir to working directory and display tree
-        os.chdir(workdir)
-        workdir = os.getcwd()
+        # resolve working directory
+        workdir = __GetWorkDir(basedir, workdir)
 
         # parse main dictionary
-        config = lib.ParseJobConfig(basedir, workdir)
-
-        # create directory tree for archive
-        dirtree = workdir.replace(basedir, "<ROOT>").split(os.sep)
+        with lib.ProfilePhase("parse", workdir):
+            config = lib.ParseJobConfig(basedir, workdir, cache)
 
         # print directories that will be archived
-        pathdir = ""
-        for nodedir in dirtree:
-            pathdir = pathdir + nodedir
-
-            if pathdir not in archive_list:
-                print(f'{" "*4}- {pathdir}/jobnode.archive/{tag}')
-                archive_list.append(pathdir)
-
-            pathdir = pathdir + os.sep
+        node_list = []
+        for nodedir in lib.GetNodeList(basedir, workdir):
+            if nodedir not in claimed:
+                print(
+                    f'{" "*4}- {nodedir.replace(basedir,"<ROOT>")}/jobnode.archive/{tag}'
+                )
+                node_list.append(nodedir)
+                claimed.add(nodedir)
 
-        lib.CreateArchive(config, tag)
+        args_list.append((config, tag, node_list))
 
-        # Return to base directory
-        os.chdir(basedir)
+    # create archives
+    lib.FunctionPool(lib.CreateArchive, args_list, jobs)
 
 
-def export(dest, dirlist):
+def export(dest, dirlist, jobs=1, checksum="sha256", incremental=False, by_hash=False):
     """
     \b
     Export directory tree to an external folder
@@ -210,40 +539,411 @@ def export(dest, dirlist):
     # get base directory
     basedir = os.getcwd()
 
+    # destination is relative to base directory
+    dest = os.path.join(basedir, dest)
+
+    checksum = None if checksum == "none" else checksum
+
+    if by_hash and not (incremental and checksum):
+        raise ValueError("[jobrunner] --by-hash requires --incremental and a checksum")
+
+    # files copied by earlier exports to the destination
+    manifest = lib.LoadExportManifest(dest)
+
+    # create a cache to resolve Jobfiles along the
+    # directory tree only once for the whole dirlist
+    cache = {}
+
     # print root directory
     print(f"{lib.Color.purple}ROOT:{lib.Color.end} {basedir}")
     print(f"\n{lib.Color.purple}EXPORT:{lib.Color.end}")
 
-    export_list = []
+    # list of arguments for each working directory
+    args_list = []
+
+    # node directories claimed by a working directory, nodes shared by
+    # working directories are exported once using the first claim
+    claimed = set()
 
     # loop over dirlist
     for workdir in dirlist:
 
-        # chdir to working directory and display tree
-        os.chdir(workdir)
-        workdir = os.getcwd()
+        # resolve working directory
+        workdir = __GetWorkDir(basedir, workdir)
 
         # parse main dictionary
-        config = lib.ParseJobConfig(basedir, workdir)
+        with lib.ProfilePhase("parse", workdir):
+            config = lib.ParseJobConfig(basedir, workdir, cache)
+
+        # skip working directories that were exported before their
+        # nodes are claimed, so that shared nodes are exported by
+        # the working directories that follow
+        if not incremental and lib.IsTreeExported(config, dest):
+            continue
+
+        # print directories that will be exported
+        node_list = []
+        for nodedir in lib.GetNodeList(basedir, workdir):
+            if nodedir not in claimed:
+                print(f'{" "*4}- {nodedir.replace(basedir,"<ROOT>")}')
+                node_list.append(nodedir)
+                claimed.add(nodedir)
+
+        args_list.append(
+            (
+                config,
+                dest,
+                node_list,
+                manifest if incremental else None,
+                checksum,
+                by_hash,
+            )
+        )
+
+    # create directories and list files of each tree, then copy files
+    # of all trees using a single pool so that the largest go first
+    plan_list = lib.FunctionPool(lib.PlanExportTree, args_list, jobs)
+
+    # rename archived files once all trees are planned, then copy files
+    result_list = lib.MoveFiles(
+        [entry for _, move_list, _ in plan_list for entry in move_list],
+        jobs,
+        checksum,
+    )
+
+    result_list += lib.CopyFiles(
+        [entry for copy_list, _, _ in plan_list for entry in copy_list],
+        jobs,
+        checksum,
+        [entry for _, _, remove_list in plan_list for entry in remove_list],
+    )
 
-        # create directory tree for archive
-        dirtree = workdir.replace(basedir, "<ROOT>").split(os.sep)
+    print(f"\n{lib.Color.purple}DEST:{lib.Color.end} {dest}")
 
-        # print directories that will be archived
-        pathdir = ""
-        for nodedir in dirtree:
-            pathdir = pathdir + nodedir
+    # record copied files for incremental exports
+    if result_list:
+        lib.WriteExportManifest(dest, manifest, result_list, checksum)
+
+    # write checksums of copied files
+    if checksum and result_list:
+        manifest = lib.WriteChecksumManifest(dest, result_list, checksum)
+        print(
+            f"\n{lib.Color.purple}CHECKSUM:{lib.Color.end} {manifest} "
+            + f"({len(result_list)} files)"
+        )
 
-            if pathdir not in export_list:
-                print(f'{" "*4}- {pathdir}')
-                export_list.append(pathdir)
 
-            pathdir = pathdir + os.sep
+def index():
+    """
+    Create an index of Jobfiles in directory tree
+    """
+    # get base directory
+    basedir = os.getcwd()
 
-        # create archive
-        lib.ExportTree(config, dest)
+    # print root directory
+    print(f"{lib.Color.purple}ROOT:{lib.Color.end} {basedir}")
 
-        # Return to base directory
-        os.chdir(basedir)
+    # walk the directory tree and write index
+    tree_index = lib.CreateTreeIndex(basedir)
 
-    print(f"\n{lib.Color.purple}DEST:{lib.Color.end} {dest}")
+    # print leaf nodes that can be submitted as jobs
+    print(f"\n{lib.Color.purple}LEAVES:{lib.Color.end}")
+    for reldir, node in sorted(tree_index["nodes"].items()):
+        if node["leaf"]:
+            print(f'{" "*4}- {os.sep.join(["<ROOT>", reldir]).rstrip(os.sep)}')
+
+    print(
+        f"\n{lib.Color.purple}INDEX:{lib.Color.end} "
+        + f'{lib.GetIndexPath(basedir).replace(basedir,"<ROOT>")} '
+        + f'({len(tree_index["dirs"])} directories, '
+        + f'{len(tree_index["nodes"])} Jobfiles)'
+    )
+
+
+def cache(action):
+    """
+    Manage cache of parsed Jobfiles
+    """
+    # get base directory
+    basedir = os.getcwd()
+
+    # print root directory
+    print(f"{lib.Color.purple}ROOT:{lib.Color.end} {basedir}")
+    print(
+        f"{lib.Color.purple}CACHE:{lib.Color.end} "
+        + f'{lib.GetCacheDir(basedir).replace(basedir,"<ROOT>")}'
+    )
+
+    if action == "stats":
+        stats = lib.GetCacheStats(basedir)
+        lookups = stats["hits"] + stats["misses"]
+
+        print(f"\n{lib.Color.purple}STATS:{lib.Color.end}")
+        print(f'{" "*4}- entries: {stats["entries"]}')
+        print(f'{" "*4}- size: {stats["size"]} bytes')
+        print(f'{" "*4}- hits: {stats["hits"]}')
+        print(f'{" "*4}- misses: {stats["misses"]}')
+        if lookups:
+            print(f'{" "*4}- hit ratio: {stats["hits"]/lookups:.2%}')
+
+    elif action == "clear":
+        lib.ClearCache(basedir)
+        print(f"\n{lib.Color.green}CLEARED {lib.Color.end}")
+
+    else:
+        raise ValueError(f"[jobrunner] Unknown cache action {action}")
+
+
+def report(dirlist, csvfile=None, sort="wall"):
+    """
+    Report resource usage of jobs in a directory tree
+    """
+    # get base directory
+    basedir = os.getcwd()
+
+    # print root directory
+    print(f"{lib.Color.purple}ROOT:{lib.Color.end} {basedir}")
+
+    # collect job.metrics from directory trees
+    metrics_list = lib.FindJobMetrics(
+        [__GetWorkDir(basedir, workdir) for workdir in dirlist or ["."]]
+    )
+
+    if not metrics_list:
+        print(f"\n{lib.Color.purple}REPORT:{lib.Color.end} no job.metrics found")
+        return
+
+    metrics_list.sort(key=lambda entry: entry[2].get(sort, 0), reverse=True)
+
+    # columns of the table with heading, key, width and format
+    column_list = [
+        ("rc", "returncode", 4, ""),
+        ("wall (s)", "wall", 10, ".2f"),
+        ("user (s)", "user", 10, ".2f"),
+        ("sys (s)", "sys", 9, ".2f"),
+        ("rss (MB)", "max_rss", 10, ".1f"),
+        ("blk in", "block_in", 9, ""),
+        ("blk out", "block_out", 9, ""),
+        ("ctx sw", "switches", 9, ""),
+    ]
+
+    # context switches are reported as a single column
+    for workdir, script, metrics in metrics_list:
+        metrics["switches"] = metrics.get("voluntary_switches", 0) + metrics.get(
+            "involuntary_switches", 0
+        )
+
+    name_list = [
+        f'{workdir.replace(basedir,"<ROOT>")}/{script}'
+        for workdir, script, metrics in metrics_list
+    ]
+    name_width = max(len(name) for name in name_list)
+
+    print(f"\n{lib.Color.purple}REPORT:{lib.Color.end}")
+    print(
+        f'{" "*4}{"job":<{name_width}}'
+        + "".join(f"{heading:>{width}}" for heading, key, width, spec in column_list)
+    )
+    for name, (workdir, script, metrics) in zip(name_list, metrics_list):
+        print(
+            f'{" "*4}{name:<{name_width}}'
+            + "".join(
+                f"{metrics.get(key, 0):>{width}{spec}}"
+                for heading, key, width, spec in column_list
+            )
+        )
+
+    # totals across jobs
+    wall = sum(metrics.get("wall", 0) for _, _, metrics in metrics_list)
+    cpu = sum(
+        metrics.get("user", 0) + metrics.get("sys", 0) for _, _, metrics in metrics_list
+    )
+    max_rss = max(metrics.get("max_rss", 0) for _, _, metrics in metrics_list)
+
+    print(
+        f"\n{lib.Color.purple}TOTAL:{lib.Color.end} {len(metrics_list)} jobs, "
+        + f"{wall:.2f} s wall, {cpu:.2f} s CPU, {max_rss:.1f} MB peak"
+    )
+
+    # write all fields to a CSV file
+    if csvfile:
+        field_list = sorted(
+            {
+                key
+                for _, _, metrics in metrics_list
+                for key in metrics.keys()
+                if key != "switches"
+            }
+        )
+
+        with open(os.path.join(basedir, csvfile), "w", newline="") as output:
+            writer = csv.writer(output)
+            writer.writerow(["workdir", "script", *field_list])
+            for workdir, script, metrics in metrics_list:
+                writer.writerow(
+                    [
+                        os.path.relpath(workdir, basedir),
+                        script,
+                        *[metrics.get(key, "") for key in field_list],
+                    ]
+                )
+
+        print(f"{lib.Color.purple}CSV:{lib.Color.end} {csvfile}")
+
+
+def tail(dirlist, lines=10):
+    """
+    Display last lines of job.output in working directories
+    """
+    # get base directory
+    basedir = os.getcwd()
+
+    # set variable to determine console separator
+    separator = False
+
+    for workdir in dirlist:
+
+        # add separator to improve output readiblity
+        if separator:
+            lib.ConsoleSeparator()
+
+        # resolve working directory and find output
+        workdir = __GetWorkDir(basedir, workdir)
+        outputfile = lib.FindOutputFile(workdir)
+
+        if outputfile is None:
+            print(
+                f"{lib.Color.purple}OUTPUT:{lib.Color.end} "
+                + f'{workdir.replace(basedir,"<ROOT>")}/job.output not present'
+            )
+
+        else:
+            print(
+                f"{lib.Color.purple}OUTPUT:{lib.Color.end} "
+                + f'{outputfile.replace(basedir,"<ROOT>")}'
+            )
+            for line in lib.TailFile(outputfile, lines):
+                print(line)
+
+        separator = True
+
+
+def resume(run_id=None):
+    """
+    Resume an interrupted run using its journal
+    """
+    # get base directory
+    basedir = os.getcwd()
+
+    # resume the latest run if run_id is not given
+    if run_id is None:
+        run_list = lib.GetRunList(basedir)
+
+        if not run_list:
+            raise ValueError(f"[jobrunner] No runs found in {lib.GetRunsDir(basedir)}")
+
+        run_id = run_list[-1]
+
+    # find working directories that did not complete
+    run, state_dict = lib.LoadRunJournal(basedir, run_id)
+    pending_list = lib.GetPendingWorkDirs(run, state_dict)
+
+    print(f"{lib.Color.purple}ROOT:{lib.Color.end} {basedir}")
+    print(
+        f"{lib.Color.purple}RESUME:{lib.Color.end} {run_id} ({run['command']}, "
+        + f"{len(pending_list)} of {len(run['dirlist'])} working directories pending)"
+    )
+
+    for workdir in pending_list:
+        state = state_dict.get(workdir, {}).get("state", "not started")
+        print(f'{" "*4}- {workdir.replace(basedir,"<ROOT>")} ({state})')
+
+    if not pending_list:
+        print(f"\n{lib.Color.green}COMPLETE {lib.Color.end}")
+        return
+
+    lib.ConsoleSeparator()
+
+    # continue the run with the same options and journal
+    {"setup": setup, "submit": submit}[run["command"]](
+        pending_list, **run["options"], run_id=run_id
+    )
+
+
+def __GetWorkDir(basedir, workdir):
+    """
+    Resolve path to a working directory relative to base directory
+    """
+    workdir = os.path.realpath(os.path.join(basedir, workdir))
+
+    if not os.path.isdir(workdir):
+        raise ValueError(f"[jobrunner] {workdir} is not a directory")
+
+    return workdir
+
+
+def __PruneSteps(process_list, step_count):
+    """
+    Remove shared steps of setup DAG that no working directory depends
+    on and return the process list along with number of remaining steps,
+    steps are listed first and before the steps that depend on them
+    """
+    needed = set()
+    for workdir, script, parent in process_list[step_count:]:
+        while parent is not None and parent not in needed:
+            needed.add(parent)
+            parent = process_list[parent][2]
+
+    # map from old to new index of each remaining process
+    index_dict = {}
+    pruned_list = []
+
+    for index, (workdir, script, parent) in enumerate(process_list):
+        if index < step_count and index not in needed:
+            continue
+
+        index_dict[index] = len(pruned_list)
+        pruned_list.append(
+            (workdir, script, None if parent is None else index_dict[parent])
+        )
+
+    return pruned_list, len(needed)
+
+
+def __GetArraySubmissions(basedir, backend, member_list, array_size, member_dict):
+    """
+    Group working directories with identical schedular options into array
+    jobs of at most array_size members and return list of submissions,
+    members of each array job are stored in member_dict
+    """
+    options_dict = {}
+    for workdir, schedular_options in member_list:
+        options_dict.setdefault(schedular_options, []).append(workdir)
+
+    submission_list = []
+
+    for schedular_options, workdir_list in options_dict.items():
+        for index in range(0, len(workdir_list), array_size):
+            array_list = workdir_list[index : index + array_size]
+
+            # a single working directory is submitted directly
+            if len(array_list) == 1:
+                submission_list.append((array_list[0], "job.submit", 1))
+                continue
+
+            arraydir = lib.CreateArrayFile(
+                basedir, backend, schedular_options, array_list
+            )
+
+            lib.ConsoleSeparator()
+            print(
+                f"{lib.Color.purple}ARRAY:{lib.Color.end} "
+                + f'{arraydir.replace(basedir,"<ROOT>")}/job.array'
+            )
+            for workdir in array_list:
+                print(f'{" "*4}- {workdir.replace(basedir,"<ROOT>")}')
+
+            member_dict[arraydir] = array_list
+            submission_list.append((arraydir, "job.array", len(array_list)))
+
+    return submission_list
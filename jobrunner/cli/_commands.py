@@ -16,7 +16,37 @@ from jobrunner import api
     "--verbose", "-V", is_flag=True, help="print execution output on the terminal"
 )
 @click.option("--exit-on-failure", "-E", is_flag=True, help="exit if failure occurs")
-def setup(dirlist, verbose, exit_on_failure):
+@click.option(
+    "--force-regenerate",
+    is_flag=True,
+    help="regenerate job files even if their sources are unchanged",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    help="number of working directories to run concurrently",
+)
+@click.option(
+    "--dag",
+    is_flag=True,
+    help="run setup scripts shared by working directories once",
+)
+@click.option(
+    "--skip-unchanged",
+    is_flag=True,
+    help="skip jobs that succeeded and have not changed since",
+)
+@click.option(
+    "--live",
+    "-L",
+    is_flag=True,
+    help="display output of concurrent jobs as it is written",
+)
+def setup(
+    dirlist, verbose, exit_on_failure, force_regenerate, jobs, dag, skip_unchanged, live
+):
     """
     \b
     Run setup scripts in a directory
@@ -25,15 +55,51 @@ def setup(dirlist, verbose, exit_on_failure):
     \b
     Jobfiles in a directory tree provide a list of
     setup scripts which are composed into a job.setup
-    file and run along the directory tree
+    file and run along the directory tree. The file
+    is regenerated only if the scripts have changed
+    since it was last written, see job.manifest
+    \b
+
+    \b
+    With --dag, leading scripts shared by two or more
+    working directories run once as steps stored in
+    .jobrunner/setup, and each working directory runs
+    the rest of its scripts using environment of its
+    deepest shared step. Failure of a step skips the
+    working directories that depend on it
+    \b
+
+    \b
+    A fingerprint of each job that succeeds is stored
+    in job.fingerprint, and --skip-unchanged skips jobs
+    whose fingerprint has not changed since
+    \b
+
+    \b
+    With --live, output of jobs is displayed as it is
+    written, each line tagged with the working
+    directory of its job. Lines are shown at a limited
+    rate and the number of lines not shown is reported,
+    job.output keeps the complete output
     \b
 
     \b
     Bash Variables
     --------------
-    JobWorkDir - Path to working directory of the job
+    JobWorkDir - Path to working directory of the job,
+                 common directory of working directories
+                 for a shared step
     """
-    api.setup(dirlist, verbose, exit_on_failure)
+    api.setup(
+        dirlist,
+        verbose,
+        exit_on_failure,
+        force_regenerate,
+        jobs,
+        dag,
+        skip_unchanged,
+        live,
+    )
 
 
 @jobrunner.command(name="submit")
@@ -42,7 +108,64 @@ def setup(dirlist, verbose, exit_on_failure):
     "--verbose", "-V", is_flag=True, help="print execution output on the terminal"
 )
 @click.option("--exit-on-failure", "-E", is_flag=True, help="exit if failure occurs")
-def submit(dirlist, verbose, exit_on_failure):
+@click.option(
+    "--force-regenerate",
+    is_flag=True,
+    help="regenerate job files even if their sources are unchanged",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    help="number of working directories to run concurrently",
+)
+@click.option(
+    "--array",
+    is_flag=True,
+    help="submit working directories with identical schedular options as array jobs",
+)
+@click.option(
+    "--array-size",
+    default=1000,
+    type=click.IntRange(min=1),
+    help="maximum number of working directories in an array job",
+)
+@click.option(
+    "--max-inflight",
+    default=None,
+    type=click.IntRange(min=1),
+    help="maximum number of queued or running schedular jobs",
+)
+@click.option(
+    "--pack",
+    is_flag=True,
+    help="pack bash jobs onto available cores and memory",
+)
+@click.option(
+    "--skip-unchanged",
+    is_flag=True,
+    help="skip jobs that succeeded and have not changed since",
+)
+@click.option(
+    "--live",
+    "-L",
+    is_flag=True,
+    help="display output of concurrent jobs as it is written",
+)
+def submit(
+    dirlist,
+    verbose,
+    exit_on_failure,
+    force_regenerate,
+    jobs,
+    array,
+    array_size,
+    max_inflight,
+    pack,
+    skip_unchanged,
+    live,
+):
     """
     \b
     Submit a job from a directory
@@ -51,20 +174,171 @@ def submit(dirlist, verbose, exit_on_failure):
     \b
     Jobfiles in a directory tree provide a list of
     submit scripts which are composed into a job.submit
-    file for linux schedulars
+    file for linux schedulars. Files are regenerated
+    only if their sources have changed since they were
+    last written, see job.manifest
+    \b
+
+    \b
+    With --array, working directories that share the
+    schedular command and options are submitted as a
+    single array job. A job.array driver and job.index
+    map are written to .jobrunner/array, and each
+    member writes its output to job.output
+    \b
+
+    \b
+    With --max-inflight or schedular.max_inflight in
+    Jobfiles, submissions wait until the number of
+    queued or running jobs leaves room for them. The
+    schedular backend is inferred from the command or
+    set using schedular.backend (slurm, pbs, lsf, fake)
+    \b
+
+    \b
+    With --pack, jobs with schedular.command bash run
+    concurrently on cores and memory available to
+    jobrunner, using schedular.cores and
+    schedular.memory of each job. Jobs are pinned to
+    their cores and --jobs is not used
+    \b
+
+    \b
+    Bash jobs run in their own process group. With
+    schedular.timeout, the group of a job is terminated
+    when its wall-clock limit expires. Ctrl-C or SIGTERM
+    terminates groups of running jobs and cancels the rest
+    \b
+
+    \b
+    A fingerprint of each bash job that succeeds is
+    stored in job.fingerprint, covering job.submit and
+    its scripts, job.input and job.target. With
+    --skip-unchanged, jobs whose fingerprint has not
+    changed since are skipped
+    \b
+
+    \b
+    With --live, output of bash jobs is displayed as
+    it is written, each line tagged with the working
+    directory of its job. Lines are shown at a limited
+    rate and the number of lines not shown is reported,
+    job.output keeps the complete output
     \b
 
     \b
     Bash Variables
     --------------
     JobWorkDir - Path to working directory of the job
+    JobCores   - Number of cores pinned to the job with --pack
     """
-    api.submit(dirlist, verbose, exit_on_failure)
+    api.submit(
+        dirlist,
+        verbose,
+        exit_on_failure,
+        force_regenerate,
+        jobs,
+        array,
+        array_size,
+        max_inflight,
+        pack,
+        skip_unchanged,
+        live,
+    )
+
+
+@jobrunner.command(name="tail")
+@click.argument("dirlist", required=True, nargs=-1, type=str)
+@click.option(
+    "--lines",
+    "-n",
+    default=10,
+    type=click.IntRange(min=1),
+    help="number of lines to display",
+)
+def tail(dirlist, lines):
+    """
+    \b
+    Display last lines of job.output
+    \b
+
+    \b
+    Plain job.output files are read backwards from
+    the end, so that only the last lines of large
+    files are read. Output compressed using
+    JOBRUNNER_OUTPUT_CODEC (gzip or zstd) is
+    decompressed as a stream keeping the last lines
+    \b
+    """
+    api.tail(dirlist, lines)
+
+
+@jobrunner.command(name="resume")
+@click.argument("run_id", required=False, type=str)
+def resume(run_id):
+    """
+    \b
+    Resume an interrupted run of setup or submit
+    \b
+
+    \b
+    Every run of setup and submit writes a journal to
+    .jobrunner/runs/<RUN_ID> with the state of each
+    working directory. This command runs the working
+    directories that did not complete with the options
+    of the original run, working directories that were
+    submitted to a schedular or succeeded are not run
+    again. The latest run is resumed if RUN_ID is not
+    given
+    \b
+    """
+    api.resume(run_id)
+
+
+@jobrunner.command(name="report")
+@click.argument("dirlist", required=False, nargs=-1, type=str)
+@click.option(
+    "--csv",
+    "csvfile",
+    default=None,
+    type=str,
+    help="write all fields to a CSV file",
+)
+@click.option(
+    "--sort",
+    default="wall",
+    type=click.Choice(["wall", "user", "sys", "max_rss", "block_in", "block_out"]),
+    help="field used to sort jobs in decreasing order",
+)
+def report(dirlist, csvfile, sort):
+    """
+    \b
+    Report resource usage of jobs in a directory tree
+    \b
+
+    \b
+    Jobs run with bash record wall time, user and
+    system CPU time, maximum resident memory, block
+    I/O and context switches of the process and its
+    children in job.metrics of the working directory.
+    This command collects job.metrics files under the
+    directories in DIRLIST, or the current directory,
+    and displays them as a table
+    \b
+    """
+    api.report(dirlist, csvfile, sort)
 
 
 @jobrunner.command(name="clean")
 @click.argument("dirlist", required=True, nargs=-1, type=str)
-def clean(dirlist):
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    help="number of working directories to process concurrently",
+)
+def clean(dirlist, jobs):
     """
     \b
     Remove artifacts from a directory
@@ -72,11 +346,12 @@ def clean(dirlist):
 
     \b
     This command removes job.input, job.target,
-    job.setup, and job.submit files from a
+    job.setup, job.submit, job.manifest,
+    job.fingerprint, and job.metrics files from a
     working directory
     \b
     """
-    api.clean(dirlist)
+    api.clean(dirlist, jobs)
 
 
 @jobrunner.command(name="archive")
@@ -84,13 +359,20 @@ def clean(dirlist):
     "--tag", "-t", help="name of the archive", default=str(date.today()), type=str
 )
 @click.argument("dirlist", required=True, nargs=-1, type=str)
-def archive(tag, dirlist):
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    help="number of working directories to process concurrently",
+)
+def archive(tag, dirlist, jobs):
     """
     \b
     Create an archive along a directory tree
     \b
     """
-    api.archive(tag, dirlist)
+    api.archive(tag, dirlist, jobs)
 
 
 @jobrunner.command(name="export")
@@ -102,13 +384,91 @@ def archive(tag, dirlist):
     type=str,
 )
 @click.argument("dirlist", required=True, nargs=-1, type=str)
-def export(dest, dirlist):
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    help="number of working directories and files to process concurrently",
+)
+@click.option(
+    "--checksum",
+    default="sha256",
+    type=click.Choice(["sha256", "sha1", "md5", "blake2b", "none"]),
+    help="checksum of copied files written to export.<checksum> in destination",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="copy only files that are new or changed since the last export",
+)
+@click.option(
+    "--by-hash",
+    is_flag=True,
+    help="with --incremental, also compare checksums of unchanged files",
+)
+def export(dest, dirlist, jobs, checksum, incremental, by_hash):
     """
     \b
     Export directory tree to an external folder
     \b
+
+    \b
+    Files are copied by a pool of --jobs workers, largest
+    first. A checksum of each file is computed as it is
+    copied and written to export.<checksum> in the
+    destination, which can be verified with tools like
+    sha256sum -c. With --checksum none, files are copied
+    by the kernel using copy_file_range or sendfile
+    \b
+
+    \b
+    Copied files are recorded with their size and
+    modification time in export.manifest. With
+    --incremental, existing working directories in the
+    destination are updated and only files that are new
+    or have changed since are copied, --by-hash also
+    compares checksums of files whose size and time match.
+    Files are written to a temporary file and renamed
+    \b
+    """
+    api.export(dest, dirlist, jobs, checksum, incremental, by_hash)
+
+
+@jobrunner.command(name="index")
+def index():
+    """
+    \b
+    Create an index of Jobfiles in directory tree
+    \b
+
+    \b
+    This command walks the directory tree once and
+    writes .jobrunner/index with directories containing
+    a Jobfile, their ancestors, and leaf nodes. Other
+    commands use the index instead of probing the
+    filesystem for directories that are unchanged
+    \b
+    """
+    api.index()
+
+
+@jobrunner.command(name="cache")
+@click.argument("action", required=True, type=click.Choice(["stats", "clear"]))
+def cache(action):
+    """
+    \b
+    Manage cache of parsed Jobfiles
+    \b
+
+    \b
+    Parsed Jobfiles are stored in .jobrunner/cache
+    under the root directory and reused until the
+    Jobfile is modified. This command displays hit
+    and miss counts for the cache or clears it
+    \b
     """
-    api.export(dest, dirlist)
+    api.cache(action)
 
 
 @jobrunner.command(name="diff")
@@ -1,21 +1,50 @@
 """Command line interface for Jobrunner"""
 
 # Standard libraries
+import os
 import subprocess
 import pkg_resources
 
 # Feature libraries
 import click
 
+from jobrunner import lib
+
 
 @click.group(name="jobrunner", invoke_without_command=True)
 @click.pass_context
 @click.option("--version", "-v", is_flag=True)
-def jobrunner(ctx, version):
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="write timings of phases to .jobrunner/profile",
+)
+@click.option(
+    "--cprofile",
+    is_flag=True,
+    help="write cProfile statistics of the command, implies --profile",
+)
+def jobrunner(ctx, version, profile, cprofile):
     """
     \b
     Command line tool to organize and manage computing jobs.
+    \b
+
+    \b
+    With --profile, wall and CPU time of Jobfile parsing,
+    glob expansion, file composition, instruments and
+    processes are recorded for each working directory
+    and written to .jobrunner/profile as a Chrome trace
+    (trace.json) and a summary table (summary.txt)
+    \b
     """
+    # shut down running jobs on SIGTERM as on Ctrl-C
+    lib.InterruptOnTerminate()
+
+    if profile or cprofile:
+        lib.StartProfile(cprofile)
+        basedir = os.getcwd()
+        ctx.call_on_close(lambda: lib.StopProfile(basedir))
     if ctx.invoked_subcommand is None and not version:
         subprocess.run(
             "export PATH=~/.local/bin:/usr/local/bin:$PATH && jobrunner --help",
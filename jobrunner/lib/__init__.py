@@ -2,7 +2,20 @@
 
 from ._colors import *
 from ._console import *
+from ._outputtools import *
+from ._profiletools import *
+from ._processtools import *
+from ._configtools import *
 from ._parsetools import *
+from ._cachetools import *
+from ._indextools import *
 from ._filetools import *
+from ._journaltools import *
+from ._metricstools import *
+from ._tomltools import *
+from ._dagtools import *
+from ._schedulartools import *
+from ._arraytools import *
+from ._copytools import *
 from ._archivetools import *
 from ._utilities import *
@@ -6,7 +6,7 @@ import shutil
 from jobrunner import lib
 
 
-def CreateArchive(config, archive_tag):
+def CreateArchive(config, archive_tag, node_list=None):
     """
     Create an archive of artifacts
     along a directory node
@@ -17,17 +17,19 @@ def CreateArchive(config, archive_tag):
                 job configuration in directory node
 
     archive_tag :  Tag for the archive
+
+    node_list : List of node directories to archive, defaults
+                to all directories between basedir and workdir
     """
     # rename archive_tag with proper extension
     archive_tag = "jobnode.archive/" + archive_tag
 
     # get a list of directories along the node between basedir and workdir
-    node_list = lib.GetNodeList(config.job.basedir, config.job.workdir)
+    if node_list is None:
+        node_list = lib.GetNodeList(config.job.basedir, config.job.workdir)
 
     for nodedir in node_list:
 
-        os.chdir(nodedir)
-
         # check if archive directory already exists and handle exceptions
         if os.path.exists(nodedir + os.sep + archive_tag):
             print(
@@ -41,17 +43,14 @@ def CreateArchive(config, archive_tag):
             archive_list = []
 
             # get the list of files in nodedir
-            nodefile_list = [
-                os.path.abspath(nodefile)
-                for nodefile in next(os.walk("."), (None, None, []))[2]
-            ]
+            nodefile_list = lib.GetNodeFiles(nodedir)
 
             # create a reference file list to test which nodefile should be archived
             ref_list = config.job.archive + [
                 nodedir + os.sep + "job.input",
                 nodedir + os.sep + "job.setup",
                 nodedir + os.sep + "job.submit",
-                nodedir + os.sep + "job.output",
+                *lib.GetOutputFiles(nodedir),
             ]
 
             # loop over list of files in nodedir and append to
@@ -68,11 +67,8 @@ def CreateArchive(config, archive_tag):
                 for filename in archive_list:
                     shutil.move(filename, nodedir + os.sep + archive_tag)
 
-    # return back to working directory
-    os.chdir(config.job.workdir)
-
 
-def ExportTree(config, archive_tag):
+def ExportTree(config, archive_tag, node_list=None, jobs=1, algorithm=None):
     """
     Export directory tree to archive
 
@@ -82,89 +78,197 @@ def ExportTree(config, archive_tag):
                 job configuration in directory node
 
     archive_tag :  Tag for the archive
+
+    node_list : List of node directories to export, defaults
+                to all directories between basedir and workdir
+
+    jobs : Maximum number of concurrent copies
+
+    algorithm : Name of a hashlib algorithm for checksums
+                of copied files, None to skip checksums
+
+    Returns
+    -------
+    result_list : List of (dest, size, digest, mtime) for each
+                  renamed or copied file, see CopyFiles
     """
+    if IsTreeExported(config, archive_tag):
+        return []
 
-    # check if workdir already exists in the archive folder
-    workdir = config.job.workdir.replace(config.job.basedir, "")
+    copy_list, move_list, remove_list = PlanExportTree(
+        config, archive_tag, node_list, algorithm=algorithm
+    )
+    return lib.MoveFiles(move_list, jobs, algorithm) + lib.CopyFiles(
+        copy_list, jobs, algorithm, remove_list
+    )
+
+
+def IsTreeExported(config, archive_tag):
+    """
+    Check if working directory already exists in the archive folder,
+    working directories that were exported are skipped unless the
+    export is incremental
+
+    Arguments
+    ---------
+    config : Dictionary containing details of the
+                job configuration in directory node
 
-    if os.path.exists(archive_tag + os.sep + workdir):
+    archive_tag :  Tag for the archive
+
+    Returns
+    -------
+    exported : True if working directory exists in archive
+    """
+    workdir = os.path.relpath(config.job.workdir, config.job.basedir)
+
+    if os.path.exists(os.path.join(archive_tag, workdir)):
         print(f'{" "*4}[jobrunner] {workdir} already exists in {archive_tag} SKIPPING')
-        return
+        return True
+
+    return False
+
+
+def PlanExportTree(
+    config, archive_tag, node_list=None, manifest=None, algorithm=None, by_hash=False
+):
+    """
+    Create directories of an export and list the files to copy and move.
+    Archived files are moved, by renaming them if the archive is on the
+    same filesystem and by copying and removing them otherwise, and are
+    not moved over existing files. With a manifest, the export is
+    incremental, only files that are new or changed are copied or moved,
+    and archived files replace older versions in the archive. Files are
+    not moved until all working directories are planned. Working
+    directories that were exported before are not checked, see
+    IsTreeExported
+
+    Arguments
+    ---------
+    config : Dictionary containing details of the
+                job configuration in directory node
+
+    archive_tag :  Tag for the archive
+
+    node_list : List of node directories to export, defaults
+                to all directories between basedir and workdir
+
+    manifest : Dictionary of entries of export.manifest for an
+               incremental export, see LoadExportManifest
+
+    algorithm : Name of a hashlib algorithm for checksums
+
+    by_hash : Compare checksums of files with unchanged size
+              and modification time for an incremental export
+
+    Returns
+    -------
+    copy_list   : List of (source, dest, move) for each file, see CopyFiles
+    move_list   : List of (source, dest) for each file to rename, see MoveFiles
+    remove_list : List of files and directories to remove after
+                  files are moved and copied
+    """
+    copy_list, move_list, remove_list = [], [], []
+
+    # list of (source, dest) for archived files and
+    # jobnode.archive directories that are merged
+    archived_list, archivedir_list = [], []
 
     # get a list of directories along the node between basedir and workdir
-    node_list = lib.GetNodeList(config.job.basedir, config.job.workdir)
+    if node_list is None:
+        node_list = lib.GetNodeList(config.job.basedir, config.job.workdir)
 
     for nodedir in node_list:
 
-        os.chdir(nodedir)
-
-        # create the archive directory and store results
-        # create an empty list of archive and copy file
-        archive_list = []
-        copy_list = []
-
-        # get the list of files in nodedir
-        nodefile_list = [
-            os.path.abspath(nodefile)
-            for nodefile in next(os.walk("."), (None, None, []))[2]
-        ]
+        # destination of the node directory
+        exportdir = os.path.normpath(
+            os.path.join(archive_tag, os.path.relpath(nodedir, config.job.basedir))
+        )
 
         # create a reference file list to test which nodefile should be archived
         ref_list = config.job.archive + [
             nodedir + os.sep + "job.input",
             nodedir + os.sep + "job.setup",
             nodedir + os.sep + "job.submit",
-            nodedir + os.sep + "job.output",
-            nodedir + os.sep + "jobnode.archive",
+            *lib.GetOutputFiles(nodedir),
         ]
 
-        # loop over list of files in nodedir and append to archive_list and copy_list
-        for filename in nodefile_list:
-            if filename in ref_list:
-                archive_list.append(filename)
-            else:
-                copy_list.append(filename)
-
         # create archive directory
-        os.makedirs(
-            f"{archive_tag + os.sep + nodedir.replace(config.job.basedir,'')}",
-            exist_ok=True,
-        )
+        os.makedirs(exportdir, exist_ok=True)
 
-        if archive_list:
-            # loop over archive_list and archive contents
-            for filename in archive_list:
-                shutil.move(
+        # loop over list of files in nodedir, archived files are moved
+        # and other files are copied unless they were exported before,
+        # or unless they are unchanged for an incremental export
+        for filename in lib.GetNodeFiles(nodedir):
+            destname = os.path.join(exportdir, os.path.basename(filename))
+
+            if filename in ref_list:
+                archived_list.append((filename, destname))
+
+            elif manifest is not None:
+                if lib.IsFileChanged(
                     filename,
-                    archive_tag + os.sep + nodedir.replace(config.job.basedir, ""),
+                    destname,
+                    manifest.get(os.path.relpath(destname, archive_tag)),
+                    algorithm if by_hash else None,
+                ):
+                    copy_list.append((filename, destname, False))
+
+            elif os.path.exists(destname):
+                print(
+                    f"[jobrunner] {os.path.relpath(destname, archive_tag)} not copied"
                 )
 
-        if copy_list:
-            # loop over copy_list and archive contents
-            for filename in copy_list:
-                if os.path.exists(
-                    archive_tag
-                    + os.sep
-                    + nodedir.replace(config.job.basedir, "")
-                    + os.sep
-                    + filename.replace(nodedir, "")
-                ):
-                    ftrimmed = filename.replace(nodedir, "")
-                    print(
-                        f"[jobrunner] {nodedir.replace(config.job.basedir,'')+ ftrimmed} not copied"
+            else:
+                copy_list.append((filename, destname, False))
+
+        # files in jobnode.archive are merged into the archive
+        # of the destination and the directory is removed
+        sourcedir = nodedir + os.sep + "jobnode.archive"
+
+        if os.path.isdir(sourcedir):
+            for dirpath, subdirs, files in os.walk(sourcedir):
+                destdir = os.path.normpath(
+                    os.path.join(
+                        exportdir,
+                        "jobnode.archive",
+                        os.path.relpath(dirpath, sourcedir),
                     )
+                )
+                os.makedirs(destdir, exist_ok=True)
 
-                else:
-                    shutil.copy(
-                        filename,
-                        archive_tag + os.sep + nodedir.replace(config.job.basedir, ""),
+                for filename in files:
+                    archived_list.append(
+                        (dirpath + os.sep + filename, destdir + os.sep + filename)
                     )
 
-        if os.path.exists(nodedir + os.sep + "jobnode.archive"):
-            shutil.move(
-                nodedir + os.sep + "jobnode.archive",
-                archive_tag + os.sep + nodedir.replace(config.job.basedir, ""),
-            )
+            archivedir_list.append(sourcedir)
+
+    # archived files that are unchanged in an incremental export are
+    # removed, others are renamed on the same filesystem or copied
+    for filename, destname in archived_list:
+
+        if manifest is None:
+            if os.path.lexists(destname):
+                raise ValueError(
+                    f"[jobrunner] {destname} already exists, {filename} not moved"
+                )
+
+        elif not lib.IsFileChanged(
+            filename,
+            destname,
+            manifest.get(os.path.relpath(destname, archive_tag)),
+            algorithm if by_hash else None,
+        ):
+            remove_list.append(filename)
+            continue
+
+        if os.stat(filename).st_dev == os.stat(os.path.dirname(destname)).st_dev:
+            move_list.append((filename, destname))
+        else:
+            copy_list.append((filename, destname, True))
+
+    # directories are removed after the files they contain
+    remove_list.extend(archivedir_list)
 
-    # return back to working directory
-    os.chdir(config.job.workdir)
+    return copy_list, move_list, remove_list
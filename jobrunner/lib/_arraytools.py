@@ -0,0 +1,90 @@
+# Standard libraries
+import os
+import hashlib
+
+
+def GetArrayDir(basedir):
+    """
+    Get path to the directory with array job scripts
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+    """
+    return basedir + os.sep + ".jobrunner" + os.sep + "array"
+
+
+def CreateArrayFile(basedir, backend, options, workdir_list):
+    """
+    Create a job.array driver script that submits job.submit of a list of
+    working directories as members of a single array job, along with a
+    job.index file that maps index of each member to its working directory
+
+    Arguments
+    ---------
+    basedir      : Base directory (top level) of a project
+    backend      : Schedular backend used to submit the array job
+    options      : Schedular options shared by the working directories
+    workdir_list : List of working directories
+
+    Returns
+    -------
+    arraydir : Directory containing job.array and job.index
+    """
+    # check if the schedular backend supports array jobs
+    if backend.array_directive is None:
+        raise ValueError(
+            f"[jobrunner] Array jobs not supported for schedular.command "
+            + f'"{backend.command}", set schedular.backend to a schedular'
+        )
+
+    # directory for the array job is named by its members and options
+    arraydir = (
+        GetArrayDir(basedir)
+        + os.sep
+        + hashlib.sha1(
+            "\n".join([backend.command, *options, *workdir_list]).encode()
+        ).hexdigest()[:16]
+    )
+
+    os.makedirs(arraydir, exist_ok=True)
+
+    # write map from index to working directory, line number
+    # of a working directory is the index of its member
+    with open(arraydir + os.sep + "job.index", "w") as indexfile:
+        for workdir in workdir_list:
+            indexfile.write(f"{workdir}\n")
+
+    # open job.array in write mode and start populating
+    with open(arraydir + os.sep + "job.array", "w") as arrayfile:
+
+        # write the header
+        arrayfile.write("#!/bin/bash\n")
+
+        # add commands from schedular.options and the array directive
+        arrayfile.write("\n")
+        for entry in options:
+            arrayfile.write(f"{entry}\n")
+
+        arrayfile.write(
+            backend.array_directive.format(
+                first=backend.array_first,
+                last=backend.array_first + len(workdir_list) - 1,
+            )
+            + "\n"
+        )
+
+        # set -e to return when error is detected
+        arrayfile.write("\nset -e\n")
+
+        # find working directory for the index of this member
+        arrayfile.write(
+            f'\nJobWorkDir=$(sed -n "$((${backend.array_variable} - {backend.array_first} + 1))p" '
+            + f'"{arraydir + os.sep}job.index")\n'
+        )
+
+        # run job.submit of the working directory
+        arrayfile.write('\ncd "$JobWorkDir"\n')
+        arrayfile.write("bash job.submit > job.output 2>&1\n")
+
+    return arraydir
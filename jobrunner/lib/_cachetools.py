@@ -0,0 +1,208 @@
+# Standard libraries
+import os
+import sys
+import json
+import atexit
+import shutil
+import marshal
+import hashlib
+
+# version of parsed contents stored in cache entries, increment when
+# parsing of Jobfiles changes so that entries of older versions are
+# treated as misses, see ParseJobConfig and __ParseJobfile
+__CacheVersion = 3
+
+# counters for cache hits and misses during this invocation
+__CacheCounters = {}
+
+
+def GetCacheDir(basedir):
+    """
+    Get path to the Jobfile cache directory
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+    """
+    return basedir + os.sep + ".jobrunner" + os.sep + "cache"
+
+
+def LoadJobfileCache(basedir, jobfile, jobfile_stat):
+    """
+    Load parsed contents of a Jobfile from the on-disk cache. An entry
+    is valid only if the modification time, size, and inode of the
+    Jobfile match the values stored with the entry, and the entry was
+    written by the same cache version and Python version
+
+    Arguments
+    ---------
+    basedir      : Base directory (top level) of a project
+    jobfile      : Path to Jobfile
+    jobfile_stat : Result of os.stat on the Jobfile
+
+    Returns
+    -------
+    work_dict : Dictionary containing parsed contents of Jobfile,
+                None if a valid entry is not present in the cache
+    """
+    counters = __GetCounters(basedir)
+
+    try:
+        with open(__GetEntryPath(basedir, jobfile), "rb") as entry:
+            version, path, key, work_dict = marshal.load(entry)
+
+        if (version, path, key) == (
+            (__CacheVersion, *sys.version_info[:2]),
+            jobfile,
+            __GetEntryKey(jobfile_stat),
+        ):
+            counters["hits"] += 1
+            return work_dict
+
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    counters["misses"] += 1
+    return None
+
+
+def SaveJobfileCache(basedir, jobfile, jobfile_stat, work_dict):
+    """
+    Save parsed contents of a Jobfile to the on-disk cache
+
+    Arguments
+    ---------
+    basedir      : Base directory (top level) of a project
+    jobfile      : Path to Jobfile
+    jobfile_stat : Result of os.stat on the Jobfile
+    work_dict    : Dictionary containing parsed contents of Jobfile
+    """
+    entry_path = __GetEntryPath(basedir, jobfile)
+
+    try:
+        # values like dates in toml files cannot be serialized
+        # by marshal, skip caching the Jobfile in that case
+        content = marshal.dumps(
+            (
+                (__CacheVersion, *sys.version_info[:2]),
+                jobfile,
+                __GetEntryKey(jobfile_stat),
+                work_dict,
+            )
+        )
+
+        # write to a temporary file and replace the entry so that
+        # concurrent invocations do not read a partial entry
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        with open(entry_path + f".{os.getpid()}", "wb") as entry:
+            entry.write(content)
+        os.replace(entry_path + f".{os.getpid()}", entry_path)
+
+    except (OSError, ValueError):
+        pass
+
+
+def GetCacheStats(basedir):
+    """
+    Get statistics for the Jobfile cache
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+
+    Returns
+    -------
+    stats : Dictionary with number of entries, size in bytes,
+            and accumulated count of hits and misses
+    """
+    cachedir = GetCacheDir(basedir)
+
+    stats = {"entries": 0, "size": 0, "hits": 0, "misses": 0}
+
+    if not os.path.isdir(cachedir):
+        return stats
+
+    with os.scandir(cachedir) as entries:
+        for entry in entries:
+            if entry.name != "stats" and entry.is_file():
+                stats["entries"] += 1
+                stats["size"] += entry.stat().st_size
+
+    try:
+        with open(cachedir + os.sep + "stats", "r") as statsfile:
+            counters = json.load(statsfile)
+        stats["hits"] = counters["hits"]
+        stats["misses"] = counters["misses"]
+
+    except (OSError, ValueError, KeyError):
+        pass
+
+    return stats
+
+
+def ClearCache(basedir):
+    """
+    Remove the Jobfile cache
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+    """
+    # discard counters of this invocation to avoid
+    # recreating the cache directory on exit
+    __CacheCounters.pop(basedir, None)
+
+    if os.path.isdir(GetCacheDir(basedir)):
+        shutil.rmtree(GetCacheDir(basedir))
+
+
+def __GetEntryPath(basedir, jobfile):
+    """
+    Get path to the cache entry for a Jobfile
+    """
+    return GetCacheDir(basedir) + os.sep + hashlib.sha1(jobfile.encode()).hexdigest()
+
+
+def __GetEntryKey(jobfile_stat):
+    """
+    Get validation key for a cache entry
+    """
+    return (jobfile_stat.st_mtime_ns, jobfile_stat.st_size, jobfile_stat.st_ino)
+
+
+def __GetCounters(basedir):
+    """
+    Get hit and miss counters for a base directory
+    """
+    if basedir not in __CacheCounters:
+        __CacheCounters[basedir] = {"hits": 0, "misses": 0}
+
+    return __CacheCounters[basedir]
+
+
+def __SaveCounters():
+    """
+    Add counters of this invocation to accumulated
+    statistics stored in the cache directory
+    """
+    for basedir, counters in __CacheCounters.items():
+
+        stats = GetCacheStats(basedir)
+
+        try:
+            os.makedirs(GetCacheDir(basedir), exist_ok=True)
+            with open(GetCacheDir(basedir) + os.sep + "stats", "w") as statsfile:
+                json.dump(
+                    {
+                        "hits": stats["hits"] + counters["hits"],
+                        "misses": stats["misses"] + counters["misses"],
+                    },
+                    statsfile,
+                )
+
+        except OSError:
+            pass
+
+
+# save counters when the invocation ends
+atexit.register(__SaveCounters)
@@ -0,0 +1,275 @@
+# Standard libraries
+import os
+import re
+import glob
+import fnmatch
+from collections.abc import Sequence
+
+# local imports
+from jobrunner import lib
+
+
+class NodeList(Sequence):
+    """
+    Class NodeList for an immutable list of values along a directory
+    tree. Values added by a node are stored in a tuple along with a
+    reference to the list of the parent node, so lists of sibling
+    nodes share storage with their parent
+    """
+
+    __slots__ = ("_parent", "_items", "_length")
+
+    def __init__(self, items=(), parent=None):
+        """
+        Constructor
+
+        Arguments
+        ---------
+        items  : Values added by the node
+        parent : NodeList of the parent node
+        """
+        self._parent = parent if parent is not None and parent._length else None
+        self._items = tuple(items)
+        self._length = len(self._items) + (parent._length if self._parent else 0)
+
+    def Extend(self, items):
+        """
+        Create a NodeList for a child node that extends current list
+
+        Arguments
+        ---------
+        items : Values added by the child node
+
+        Returns
+        -------
+        nodelist : Current list if there are no values to add
+        """
+        if not items:
+            return self
+
+        return type(self)(items, self)
+
+    def _Chain(self):
+        """
+        Iterate over stored items from root to current node
+        """
+        chain = []
+        nodelist = self
+        while nodelist is not None:
+            chain.append(nodelist._items)
+            nodelist = nodelist._parent
+
+        for items in reversed(chain):
+            yield from items
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+
+        if index < 0:
+            index += self._length
+
+        if not 0 <= index < self._length:
+            raise IndexError("NodeList index out of range")
+
+        # walk up the parent chain to the node that stores the index,
+        # each node stores the last values of the list of its length
+        nodelist = self
+        while index < nodelist._length - len(nodelist._items):
+            nodelist = nodelist._parent
+
+        return nodelist._items[index - nodelist._length + len(nodelist._items)]
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return self._Chain()
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, Sequence)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class GlobList(NodeList):
+    """
+    Class GlobList for list of files matching glob patterns. Patterns
+    are compiled when added and expanded on first access, using a single
+    directory scan for all patterns that belong to the same directory
+    """
+
+    __slots__ = ("_paths",)
+
+    def __init__(self, patterns=(), parent=None):
+        """
+        Constructor
+
+        Arguments
+        ---------
+        patterns : List of absolute glob patterns
+        parent   : GlobList of the parent node
+        """
+        compiled = []
+        for pattern in patterns:
+            dirname, basename = os.path.split(pattern)
+            compiled.append(
+                (dirname, basename, re.compile(fnmatch.translate(basename)).match)
+            )
+
+        super().__init__(compiled, parent)
+        self._paths = None
+
+    def __expand(self):
+        """
+        Expand patterns to a list of matching paths
+        """
+        if self._paths is not None:
+            return self._paths
+
+        with lib.ProfilePhase("glob"):
+            self._paths = self.__scan()
+
+        return self._paths
+
+    def __scan(self):
+        """
+        Scan directories for paths matching the patterns
+        """
+        # group patterns by directory
+        dir_patterns = {}
+        for dirname, basename, match in self._Chain():
+            dir_patterns.setdefault(dirname, []).append((basename, match))
+
+        paths = set()
+
+        for dirname, pattern_list in dir_patterns.items():
+
+            # directories with wildcards are expanded by glob
+            if any(char in dirname for char in "*?["):
+                for basename, match in pattern_list:
+                    paths.update(glob.glob(dirname + os.sep + basename))
+                continue
+
+            # scan the directory once for all patterns
+            try:
+                with os.scandir(dirname or os.curdir) as entries:
+                    names = [entry.name for entry in entries]
+            except OSError:
+                continue
+
+            for basename, match in pattern_list:
+
+                # same as glob, hidden files only match
+                # patterns that start with a period
+                hidden = basename.startswith(".")
+
+                for name in names:
+                    if (hidden or not name.startswith(".")) and match(name):
+                        paths.add(dirname + os.sep + name)
+
+        return list(paths)
+
+    def __getitem__(self, index):
+        return self.__expand()[index]
+
+    def __len__(self):
+        return len(self.__expand())
+
+    def __bool__(self):
+        return bool(self.__expand())
+
+    def __iter__(self):
+        return iter(self.__expand())
+
+    def __contains__(self, value):
+        return value in self.__expand()
+
+
+class __ConfigSection:
+    """
+    Class ConfigSection with methods shared by configuration sections
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **values):
+        """
+        Constructor
+        """
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    def copy(self):
+        """
+        Create a shallow copy, lists are shared since they are immutable
+        """
+        section = type(self).__new__(type(self))
+        for name in self.__slots__:
+            setattr(section, name, getattr(self, name))
+        return section
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+
+class SchedularSection(__ConfigSection):
+    """
+    Class SchedularSection for schedular configuration
+    """
+
+    __slots__ = (
+        "command",
+        "options",
+        "backend",
+        "max_inflight",
+        "cores",
+        "memory",
+        "gpus",
+        "timeout",
+    )
+
+
+class JobSection(__ConfigSection):
+    """
+    Class JobSection for job configuration
+    """
+
+    __slots__ = (
+        "input",
+        "target",
+        "submit",
+        "setup",
+        "clean",
+        "archive",
+        "basedir",
+        "workdir",
+    )
+
+
+class JobConfig(__ConfigSection):
+    """
+    Class JobConfig for merged configuration of a directory node
+    """
+
+    __slots__ = ("instrument", "schedular", "job")
+
+    def copy(self):
+        """
+        Create a copy with copies of sections
+        """
+        return JobConfig(
+            instrument=self.instrument,
+            schedular=self.schedular.copy(),
+            job=self.job.copy(),
+        )
@@ -1,6 +1,8 @@
 # Standard libraries
 import os
 import sys
+import time
+import signal
 import subprocess
 
 # Feature libraries
@@ -17,6 +19,30 @@ def ConsoleSeparator():
         print(100 * "—")
 
 
+def ProgressBar(total=None, **kwargs):
+    """
+    Create a progress bar that is refreshed by a timer at a fixed
+    rate, the bar is disabled when the console is not a terminal
+
+    Arguments
+    ---------
+    total  : Number of items, None for a spinner without a bar
+    kwargs : Additional options for alive_bar
+
+    Returns
+    -------
+    bar : Context manager for alive_bar
+    """
+    return alive_bar(
+        total,
+        spinner="waves",
+        stats=False,
+        refresh_secs=0.2,
+        disable=not sys.stdout.isatty(),
+        **kwargs,
+    )
+
+
 def DisplayTree(basedir, workdir):
     """
     Display tree information on console
@@ -28,26 +54,35 @@ def DisplayTree(basedir, workdir):
 def SchedularProcess(basedir, workdir, command, script):
     """
     Submit job using a schedular
-    """
-    print(
-        f'\n{lib.Color.purple}SUBMIT:{lib.Color.end} {workdir.replace(basedir,"<ROOT>")}/{script}'
-    )
 
-    process = subprocess.run(
-        f"{command} {script}",
-        shell=True,
-        check=True,
-    )
+    Returns
+    -------
+    jobid : Job ID reported by the schedular, None if not available
+    """
+    return lib.GetSchedularBackend(command).Submit(basedir, workdir, script)
 
 
-def BashProcess(basedir, workdir, script, verbose=False, exit_on_failure=False):
+def BashProcess(
+    basedir, workdir, script, verbose=False, exit_on_failure=False, timeout=None
+):
     """
-    Run a bash process based on input configuration
+    Run a bash process based on input configuration. The process runs in
+    its own process group, which is terminated when the wall-clock limit
+    in timeout seconds expires or on KeyboardInterrupt. Unless verbose,
+    the process runs in a new session. In verbose mode the process stays
+    in the session of the terminal and its group is made the foreground
+    group, so that it can read from the terminal and receives Ctrl-C and
+    Ctrl-Z, and the terminal is handed back to jobrunner when it exits
     """
     print(
         f'\n{lib.Color.purple}EXECUTE:{lib.Color.end} {workdir.replace(basedir,"<ROOT>")}/{script}'
     )
 
+    start = time.monotonic()
+
+    # output is captured to job.output, which may be compressed
+    outputfile = "job.output"
+
     if verbose:
 
         # DEVNOTE (01/29/2024): Replacing the Popen command with run command
@@ -55,7 +90,33 @@ def BashProcess(basedir, workdir, script, verbose=False, exit_on_failure=False):
         #
 
         # DEVNOTE (01/29/2024): interactive shell
-        process = subprocess.run(f"bash {script}".split())
+        tty = lib.GetForegroundTerminal()
+
+        process = subprocess.Popen(
+            f"bash {script}".split(),
+            cwd=workdir,
+            preexec_fn=lib.ForegroundProcessGroup(tty),
+        )
+
+        # return the terminal to the shell when the job is stopped
+        on_stop = None
+        if tty is not None:
+            on_stop = lambda process: lib.SuspendForegroundGroup(process, tty)
+
+        try:
+            returncode, metrics, limit = __WaitBashProcess(
+                process, start, timeout, on_stop
+            )
+
+        finally:
+            if tty is not None:
+                lib.SetForegroundGroup(tty, os.getpgrp())
+
+        # Ctrl-C from the terminal is only received by the process
+        # group of the job, and is passed on to the caller
+        if returncode == -signal.SIGINT:
+            print(f"{lib.Color.red}CANCELLED {lib.Color.end}")
+            raise KeyboardInterrupt
 
         # DEVNOTE (01/29/2024): non-interactive process (needs fixing)
         #
@@ -73,22 +134,32 @@ def BashProcess(basedir, workdir, script, verbose=False, exit_on_failure=False):
         #        output.write(line)
 
     else:
-        with open("job.output", "w") as output:
-            process = subprocess.Popen(
-                f"bash {script}".split(),
-                stdout=output,
-                stderr=subprocess.STDOUT,
-                text=True,
-            )
-
-        with alive_bar(spinner="waves", bar=None, stats=False, monitor=False) as bar:
-            while process.poll() == None:
-                bar()
+        with lib.OutputCapture(workdir) as capture:
+            with lib.ProfilePhase("launch", workdir):
+                process = subprocess.Popen(
+                    f"bash {script}".split(),
+                    stdout=capture.stdout,
+                    stderr=subprocess.STDOUT,
+                    cwd=workdir,
+                    start_new_session=True,
+                )
+
+            # block until the process exits, spinner is animated by
+            # the refresh thread of the progress bar
+            with ProgressBar(bar=None, monitor=False):
+                returncode, metrics, limit = __WaitBashProcess(process, start, timeout)
+
+        outputfile = os.path.basename(capture.outputfile)
+
+    # record resource usage of the process
+    lib.WriteJobMetrics(workdir, script, metrics)
 
     if process.returncode != 0:
         if not verbose:
-            with open("job.output", "r") as output:
-                print("".join(output.readlines()[-8:]))
+            print("".join(line + "\n" for line in capture.Tail()))
+
+        if limit.expired:
+            print(f"{lib.Color.red}TIMEOUT {lib.Color.end}after {timeout} seconds")
 
         if exit_on_failure:
             raise ValueError(f"{lib.Color.red}FAILURE {lib.Color.end}")
@@ -99,5 +170,26 @@ def BashProcess(basedir, workdir, script, verbose=False, exit_on_failure=False):
         print(f"{lib.Color.green}SUCCESS {lib.Color.end}")
 
     print(
-        f'\n{lib.Color.purple}OUTPUT:{lib.Color.end} {workdir.replace(basedir,"<ROOT>")}/job.output'
+        f'\n{lib.Color.purple}OUTPUT:{lib.Color.end} {workdir.replace(basedir,"<ROOT>")}/{outputfile}'
     )
+
+    return process.returncode
+
+
+def __WaitBashProcess(process, start, timeout=None, on_stop=None):
+    """
+    Wait for a bash process leading its process group within a wall-clock
+    limit, the process group is terminated and waited for before an
+    interrupt is passed on to the caller
+    """
+    with lib.ProcessTimeout(process, timeout) as limit:
+        try:
+            returncode, metrics = lib.WaitProcess(process, start, on_stop)
+
+        except KeyboardInterrupt:
+            lib.TerminateProcessGroup(process)
+            lib.WaitProcess(process, start)
+            print(f"{lib.Color.red}CANCELLED {lib.Color.end}")
+            raise
+
+    return returncode, metrics, limit
@@ -0,0 +1,394 @@
+# Standard libraries
+import os
+import json
+import time
+import errno
+import shutil
+import hashlib
+from concurrent import futures
+
+# local imports
+from jobrunner import lib
+
+# size of blocks read into the buffer when computing checksums
+__BlockSize = 1 << 20
+
+# errors from copy_file_range and sendfile that select the next method,
+# raised when a method is not supported for the pair of files
+__FallbackErrors = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP)
+
+
+def CopyFile(source, dest, algorithm=None):
+    """
+    Copy contents, permission bits and modification time of a file.
+    Without a checksum, data is copied by the kernel using
+    copy_file_range or sendfile and does not pass through jobrunner.
+    With a checksum, each block is read once into a reused buffer which
+    is hashed and written from the same buffer, so the checksum does not
+    need a second read of either file. Contents are written to a
+    temporary file that replaces dest when it is complete, so an
+    existing dest is never left partially written
+
+    Arguments
+    ---------
+    source    : Path to source file
+    dest      : Path to destination file
+    algorithm : Name of a hashlib algorithm, None to skip the checksum
+
+    Returns
+    -------
+    size   : Number of bytes copied
+    digest : Hexadecimal digest, None without a checksum
+    mtime  : Modification time of source in nanoseconds
+    """
+    tempfile = os.path.join(
+        os.path.dirname(dest), f".{os.path.basename(dest)}.{os.getpid()}.tmp"
+    )
+
+    try:
+        with open(source, "rb", buffering=0) as sourcefile, open(
+            tempfile, "wb"
+        ) as destfile:
+            source_stat = os.fstat(sourcefile.fileno())
+
+            if algorithm:
+                size, digest = __HashCopy(sourcefile, destfile, hashlib.new(algorithm))
+            else:
+                size, digest = __KernelCopy(sourcefile, destfile), None
+
+        shutil.copymode(source, tempfile)
+        os.utime(tempfile, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        os.replace(tempfile, dest)
+
+    except BaseException:
+        if os.path.exists(tempfile):
+            os.remove(tempfile)
+        raise
+
+    return size, digest, source_stat.st_mtime_ns
+
+
+def GetChecksum(filename, algorithm):
+    """
+    Get hexadecimal digest of file contents
+
+    Arguments
+    ---------
+    filename  : Path to file
+    algorithm : Name of a hashlib algorithm
+    """
+    hasher = hashlib.new(algorithm)
+    buffer = bytearray(__BlockSize)
+    view = memoryview(buffer)
+
+    with open(filename, "rb", buffering=0) as datafile:
+        for count in iter(lambda: datafile.readinto(buffer), 0):
+            hasher.update(view[:count])
+
+    return hasher.hexdigest()
+
+
+def __HashCopy(sourcefile, destfile, hasher):
+    """
+    Copy a file through a reused buffer, each block is read once,
+    updates hasher and is written to destfile from the same buffer
+    """
+    buffer = bytearray(__BlockSize)
+    view = memoryview(buffer)
+    size = 0
+
+    for count in iter(lambda: sourcefile.readinto(buffer), 0):
+        hasher.update(view[:count])
+        destfile.write(view[:count])
+        size += count
+
+    return size, hasher.hexdigest()
+
+
+def __KernelCopy(sourcefile, destfile):
+    """
+    Copy a file in kernel space, methods are tried in order until one is
+    supported and a buffered copy is used if none of them are
+    """
+    size = os.fstat(sourcefile.fileno()).st_size
+    copied = 0
+
+    method_list = []
+    if hasattr(os, "copy_file_range"):
+        method_list.append(
+            lambda count: os.copy_file_range(
+                sourcefile.fileno(), destfile.fileno(), count
+            )
+        )
+    if hasattr(os, "sendfile"):
+        method_list.append(
+            lambda count: os.sendfile(
+                destfile.fileno(), sourcefile.fileno(), None, count
+            )
+        )
+
+    for method in method_list:
+        try:
+            while copied < size:
+                count = method(min(size - copied, 1 << 30))
+                if count == 0:
+                    break
+                copied += count
+
+            return copied
+
+        # try next method if nothing has been copied yet
+        except OSError as error:
+            if error.errno not in __FallbackErrors or copied:
+                raise
+
+    shutil.copyfileobj(sourcefile, destfile, __BlockSize)
+
+    return os.fstat(destfile.fileno()).st_size
+
+
+def CopyFiles(copy_list, jobs=1, algorithm=None, remove_list=()):
+    """
+    Copy files using a bounded pool of worker threads, largest files are
+    copied first so that a large file does not start last and delay the
+    end. Copies run concurrently since the kernel copy and hashlib release
+    the interpreter lock
+
+    Arguments
+    ---------
+    copy_list   : List of (source, dest, move) for each file, source is
+                  removed after it is copied if move is True
+    jobs        : Maximum number of concurrent copies
+    algorithm   : Name of a hashlib algorithm, None to skip checksums
+    remove_list : List of files and directories removed after all
+                  files are copied
+
+    Returns
+    -------
+    result_list : List of (dest, size, digest, mtime) for each file, mtime
+                  is the modification time of source in nanoseconds
+    """
+    if algorithm and algorithm not in hashlib.algorithms_available:
+        raise ValueError(
+            f"[jobrunner] checksum {algorithm} not in "
+            + f"available algorithms {sorted(hashlib.algorithms_guaranteed)}"
+        )
+
+    def Copy(source, dest, move):
+        """
+        Copy a file and remove its source if it is moved
+        """
+        with lib.ProfilePhase("copy", source):
+            size, digest, mtime = CopyFile(source, dest, algorithm)
+
+        if move:
+            os.remove(source)
+
+        return dest, size, digest, mtime
+
+    # order files by decreasing size
+    copy_list = sorted(
+        copy_list, key=lambda entry: os.stat(entry[0]).st_size, reverse=True
+    )
+
+    start = time.monotonic()
+
+    with futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        with lib.ProgressBar(len(copy_list), monitor=True) as bar:
+            future_list = [executor.submit(Copy, *entry) for entry in copy_list]
+
+            for future in futures.as_completed(future_list):
+                future.result()
+                bar()
+
+    result_list = [future.result() for future in future_list]
+
+    for sourcename in remove_list:
+        if os.path.isdir(sourcename):
+            shutil.rmtree(sourcename)
+        else:
+            os.remove(sourcename)
+
+    elapsed = time.monotonic() - start
+    total = sum(entry[1] for entry in result_list) / (1 << 20)
+
+    print(
+        f"\n{lib.Color.purple}COPY:{lib.Color.end} {len(result_list)} files, "
+        + f"{total:.1f} MB in {elapsed:.2f} s ({total / max(elapsed, 1e-6):.1f} MB/s)"
+    )
+
+    return result_list
+
+
+def MoveFiles(move_list, jobs=1, algorithm=None):
+    """
+    Move files by renaming them over existing files, checksums are
+    computed before a file is moved. A file is copied and removed if
+    it cannot be renamed to another filesystem
+
+    Arguments
+    ---------
+    move_list : List of (source, dest) for each file
+    jobs      : Maximum number of concurrent checksums
+    algorithm : Name of a hashlib algorithm, None to skip checksums
+
+    Returns
+    -------
+    result_list : List of (dest, size, digest, mtime) for each file,
+                  see CopyFiles
+    """
+
+    def Move(source, dest):
+        """
+        Rename a file and return its size, checksum and modification time
+        """
+        source_stat = os.stat(source)
+        digest = GetChecksum(source, algorithm) if algorithm else None
+
+        try:
+            os.replace(source, dest)
+
+        except OSError as error:
+            if error.errno != errno.EXDEV:
+                raise
+
+            size, digest, mtime = CopyFile(source, dest, algorithm)
+            os.remove(source)
+            return dest, size, digest, mtime
+
+        return dest, source_stat.st_size, digest, source_stat.st_mtime_ns
+
+    with futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(lambda entry: Move(*entry), move_list))
+
+
+def WriteChecksumManifest(dest, result_list, algorithm):
+    """
+    Write checksums of copied files to export.<algorithm> in destination,
+    in the format of sha256sum and similar tools so that the copy can be
+    verified with "sha256sum -c export.sha256". Entries of files copied
+    by earlier exports are kept
+
+    Arguments
+    ---------
+    dest        : Destination directory
+    result_list : List of (dest, size, digest, mtime) for each file,
+                  see CopyFiles
+    algorithm   : Name of the hashlib algorithm
+
+    Returns
+    -------
+    manifest : Path to the manifest
+    """
+    manifest = dest + os.sep + f"export.{algorithm}"
+    entry_dict = {}
+
+    if os.path.isfile(manifest):
+        with open(manifest, "r") as manifestfile:
+            for line in manifestfile:
+                digest, _, filename = line.rstrip("\n").partition("  ")
+                entry_dict[filename] = digest
+
+    for filename, size, digest, mtime in result_list:
+        entry_dict[os.path.relpath(filename, dest)] = digest
+
+    # replace the manifest in a single step
+    with open(manifest + ".tmp", "w") as manifestfile:
+        for filename, digest in sorted(entry_dict.items()):
+            manifestfile.write(f"{digest}  {filename}\n")
+
+    os.replace(manifest + ".tmp", manifest)
+
+    return manifest
+
+
+def LoadExportManifest(dest):
+    """
+    Load export.manifest of a destination, which records size, modification
+    time and checksums of files in the destination when they were copied
+
+    Arguments
+    ---------
+    dest : Destination directory
+
+    Returns
+    -------
+    manifest : Dictionary of entries for paths relative to dest
+    """
+    try:
+        with open(dest + os.sep + "export.manifest", "r") as manifestfile:
+            return json.load(manifestfile)
+
+    except (OSError, ValueError):
+        return {}
+
+
+def WriteExportManifest(dest, manifest, result_list, algorithm=None):
+    """
+    Update export.manifest of a destination with copied files and replace
+    it in a single step
+
+    Arguments
+    ---------
+    dest        : Destination directory
+    manifest    : Dictionary of entries, see LoadExportManifest
+    result_list : List of (dest, size, digest, mtime) for each file,
+                  see CopyFiles
+    algorithm   : Name of the hashlib algorithm of digests
+    """
+    for filename, size, digest, mtime in result_list:
+        entry = {"size": size, "mtime": mtime}
+        if digest:
+            entry[algorithm] = digest
+
+        manifest[os.path.relpath(filename, dest)] = entry
+
+    with open(dest + os.sep + "export.manifest.tmp", "w") as manifestfile:
+        json.dump(manifest, manifestfile, indent=2, sort_keys=True)
+
+    os.replace(dest + os.sep + "export.manifest.tmp", dest + os.sep + "export.manifest")
+
+
+def IsFileChanged(source, dest, entry=None, algorithm=None):
+    """
+    Check if a file needs to be copied to dest. Size and modification time
+    of source are compared with the manifest entry, or with dest if there is
+    no entry, and checksums are compared if sizes and times match. The size
+    of dest is checked against the entry so that a file that was removed or
+    changed in the destination after the export is copied again
+
+    Arguments
+    ---------
+    source    : Path to source file
+    dest      : Path to destination file
+    entry     : Entry of dest in export.manifest, None if not present
+    algorithm : Name of a hashlib algorithm to compare checksums,
+                None to only compare size and modification time
+
+    Returns
+    -------
+    changed : True if dest is missing or differs from source
+    """
+    source_stat = os.stat(source)
+
+    try:
+        dest_stat = os.stat(dest)
+    except FileNotFoundError:
+        return True
+
+    if entry is None:
+        entry = {"size": dest_stat.st_size, "mtime": dest_stat.st_mtime_ns}
+
+    elif dest_stat.st_size != entry["size"]:
+        return True
+
+    if (source_stat.st_size, source_stat.st_mtime_ns) != (
+        entry["size"],
+        entry["mtime"],
+    ):
+        return True
+
+    if algorithm:
+        return entry.get(algorithm) != GetChecksum(source, algorithm)
+
+    return False
@@ -0,0 +1,177 @@
+# Standard libraries
+import os
+import shutil
+import hashlib
+
+# bash loop to write a snapshot of the environment after a shared step
+# of the setup DAG. Readonly and special variables of the shell are
+# skipped so that the snapshot can be sourced by dependent scripts
+__EnvSnapshot = r"""
+for __JobVar in $(compgen -v); do
+    case "$__JobVar" in
+        BASH*|SHELLOPTS|EUID|UID|PPID|SHLVL|PWD|OLDPWD|RANDOM|SRANDOM|SECONDS|\
+        LINENO|HISTCMD|FUNCNAME|GROUPS|DIRSTACK|PIPESTATUS|EPOCHREALTIME|\
+        EPOCHSECONDS|COLUMNS|LINES|_|__JobVar|__JobDecl|__JobFlags)
+            continue ;;
+    esac
+    __JobDecl=$(declare -p "$__JobVar" 2>/dev/null) || continue
+    __JobFlags=${__JobDecl#declare -}
+    __JobFlags=${__JobFlags%% *}
+    [[ "$__JobFlags" == *r* ]] && continue
+    printf '%s\n' "declare -g ${__JobDecl#declare }"
+"""
+
+
+def GetSetupDagDir(basedir):
+    """
+    Get path to the directory with shared steps of the setup DAG
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+    """
+    return basedir + os.sep + ".jobrunner" + os.sep + "setup"
+
+
+def CreateSetupDag(basedir, config_list):
+    """
+    Create a DAG of job.setup scripts for a list of working directories.
+    Leading scripts shared by two or more working directories are grouped
+    into steps that run once, and each working directory runs the rest of
+    its scripts after sourcing environment of its deepest shared step
+
+    Arguments
+    ---------
+    basedir     : Base directory (top level) of a project
+    config_list : List of job configurations for working directories
+
+    Returns
+    -------
+    step_list : List of (stepdir, parent) for shared steps, parent is
+                the index of the step that should run first or None
+
+    leaf_dict : Dictionary of (start, envfile, parent) for each working
+                directory, start is the index of the first script that
+                is not part of a shared step
+    """
+    # build a trie of scripts, each trie node stores
+    # the working directories that share its prefix
+    trie_root = {"children": {}, "workdirs": set(), "step": None}
+
+    for config in config_list:
+        trie_root["workdirs"].add(config.job.workdir)
+
+        trie_node = trie_root
+        for nodefile in config.job.setup:
+            trie_node = trie_node["children"].setdefault(
+                nodefile, {"children": {}, "workdirs": set(), "step": None}
+            )
+            trie_node["workdirs"].add(config.job.workdir)
+
+    # group trie nodes shared by two or more working directories into
+    # steps, a chain of trie nodes with the same working directories
+    # forms a single step
+    step_list = []
+    __BuildSteps(trie_root, [], step_list)
+
+    # write job.setup for each step in a directory named by its prefix
+    for step in step_list:
+        step["stepdir"] = (
+            GetSetupDagDir(basedir)
+            + os.sep
+            + hashlib.sha1("\n".join(step["prefix"]).encode()).hexdigest()[:16]
+        )
+
+        __CreateStepFile(step, step_list)
+
+    # find deepest shared step for each working directory
+    leaf_dict = {}
+
+    for config in config_list:
+        start, envfile, parent = 0, None, None
+
+        trie_node = trie_root
+        for index, nodefile in enumerate(config.job.setup):
+            trie_node = trie_node["children"][nodefile]
+
+            if trie_node["step"] is None:
+                break
+
+            parent = trie_node["step"]
+            start = index + 1
+            envfile = step_list[parent]["stepdir"] + os.sep + "job.env"
+
+        leaf_dict[config.job.workdir] = (start, envfile, parent)
+
+    return [(step["stepdir"], step["parent"]) for step in step_list], leaf_dict
+
+
+def __BuildSteps(trie_node, prefix, step_list):
+    """
+    Walk the trie and create steps for shared trie nodes
+    """
+    for nodefile, child in trie_node["children"].items():
+
+        # scripts that are not shared belong to working directories
+        if len(child["workdirs"]) < 2:
+            continue
+
+        # extend step of the parent node if no working directory branches off
+        if trie_node["step"] is not None and child["workdirs"] == trie_node["workdirs"]:
+            child["step"] = trie_node["step"]
+            step_list[child["step"]]["nodefiles"].append(nodefile)
+            step_list[child["step"]]["prefix"].append(nodefile)
+
+        # otherwise create a new step that depends on the parent step
+        else:
+            child["step"] = len(step_list)
+            step_list.append(
+                {
+                    "parent": trie_node["step"],
+                    "nodefiles": [nodefile],
+                    "prefix": prefix + [nodefile],
+                    "workdirs": child["workdirs"],
+                }
+            )
+
+        __BuildSteps(child, prefix + [nodefile], step_list)
+
+
+def __CreateStepFile(step, step_list):
+    """
+    Create job.setup for a shared step, the step runs with JobWorkDir
+    set to the common directory of working directories that share it
+    """
+    os.makedirs(step["stepdir"], exist_ok=True)
+
+    with open(step["stepdir"] + os.sep + "job.setup", "w") as stepfile:
+
+        # write the header for bash script
+        stepfile.write("#!/bin/bash\n")
+
+        # set -e to return when error is detected
+        stepfile.write("\nset -e\n")
+
+        # source environment from the parent step
+        if step["parent"] is not None:
+            parent_env = step_list[step["parent"]]["stepdir"] + os.sep + "job.env"
+            stepfile.write(f'\nsource "{parent_env}"\n')
+
+        # set environment variable for working directory
+        workdir = os.path.commonpath(list(step["workdirs"]))
+        stepfile.write(f'\nexport JobWorkDir="{workdir}"\n')
+
+        # add commands from scripts and chdir into the node directory
+        for nodefile in step["nodefiles"]:
+            stepfile.write(f"\ncd {os.path.dirname(nodefile)}\n\n")
+
+            with open(nodefile, "r") as entry:
+                shutil.copyfileobj(entry, stepfile)
+
+            stepfile.write("\n")
+
+        # write snapshot of the environment for dependent scripts
+        envfile = step["stepdir"] + os.sep + "job.env"
+        stepfile.write(__EnvSnapshot)
+        stepfile.write(f'done > "{envfile}"\n')
+        stepfile.write(f'declare -f >> "{envfile}"\n')
@@ -1,15 +1,32 @@
 # Standard libraries
 import os
+import re
+import json
 import shutil
+import hashlib
 import toml
-import subprocess
 from collections import OrderedDict
 
 # local imports
 from jobrunner import lib
 
+# version of the file layout recorded in job.manifest, increment
+# when composition of generated files changes
+__ManifestVersion = 2
 
-def CreateSetupFile(config):
+# digests of files computed during this invocation
+__FileDigests = {}
+
+# references to job.target and job.input in scripts, stored by
+# digest so that shared scripts are scanned once per invocation
+__FileReferences = {}
+
+# patterns for references outside of comments
+__TargetReference = re.compile(rb"^[^#\n]*job\.target", re.MULTILINE)
+__InputReference = re.compile(rb"^[^#\n]*job\.input", re.MULTILINE)
+
+
+def CreateSetupFile(config, force=False, start=0, envfile=None):
     """
     Create a job.setup file using the list of
     job.setup scripts from main dictionary
@@ -18,38 +35,60 @@ def CreateSetupFile(config):
     ---------
     config : Dictionary containing details of the
                 job configuration in directory tree
+
+    force  : Regenerate even if job.manifest shows
+             that job.setup is up to date
+
+    start   : Index of the first job.setup script, scripts
+              before it are run by a shared step of setup DAG
+
+    envfile : Environment of the shared step to source
+              before running the scripts
+
+    Returns
+    -------
+    regenerated : True if job.setup was written
     """
+    # skip if sources have not changed since job.setup was generated
+    recipe = __GetRecipe(config, config.job.setup[start:], start=start, envfile=envfile)
+
+    if not force and __CheckManifest(config.job.workdir, "job.setup", recipe):
+        return False
+
     # open job.setup in write mode this will replace existing job.setup in the working directory
-    with open(config.job.workdir + os.sep + "job.setup", "w") as setupfile:
+    with open(config.job.workdir + os.sep + "job.setup", "wb") as setupfile:
 
         # write the header for bash script
-        setupfile.write("#!/bin/bash\n")
+        setupfile.write(b"#!/bin/bash\n")
 
         # set -e to return when error is detected
-        setupfile.write("\nset -e\n")
+        setupfile.write(b"\nset -e\n")
+
+        # source environment from shared step of setup DAG
+        if envfile:
+            setupfile.write(f'\nsource "{envfile}"\n'.encode())
 
         # set environment variable for working directory
-        setupfile.write(f'\nexport JobWorkDir="{config.job.workdir}"\n')
+        setupfile.write(f'\nexport JobWorkDir="{config.job.workdir}"\n'.encode())
 
         # add commands from job.setup script and place a command to chdir into the node directory
-        for nodefile in config.job.setup:
+        for nodefile in config.job.setup[start:]:
 
             # get node directory from nodefile
             nodedir = os.path.dirname(nodefile)
 
-            # chdir into node directory
-            setupfile.write(f"\ncd {nodedir}\n")
+            # chdir into node directory and add some spaces
+            setupfile.write(f"\ncd {nodedir}\n\n".encode())
+
+            # copy contents of nodefile to setup script
+            __AppendFile(setupfile, nodefile)
 
-            # add some spaces
-            setupfile.write(f"\n")
+    __UpdateManifest(config.job.workdir, "job.setup", recipe)
 
-            # open nodefile in read mode and write lines to setup script
-            with open(nodefile, "r") as entry:
-                for line in entry:
-                    setupfile.write(line)
+    return True
 
 
-def CreateInputFile(config):
+def CreateInputFile(config, force=False):
     """
     Create an input file for a given simulation
     recursively using job.input between basedir
@@ -57,25 +96,27 @@ def CreateInputFile(config):
 
     config : Dictionary containing details of the
                 job configuration in directory tree
+
+    force  : Regenerate even if job.manifest shows
+             that job.input is up to date
+
+    Returns
+    -------
+    regenerated : True if job.input was written
     """
     # check to see if input files are defined in the main dictionary
     if config.job.input:
 
-        # define main dictionary
-        job_toml = {}
+        # skip if sources have not changed since job.input was generated
+        recipe = __GetRecipe(config, config.job.input)
 
-        # loop through the list of source files from job.input
-        for nodefile in config.job.input:
+        if not force and __CheckManifest(config.job.workdir, "job.input", recipe):
+            return False
 
-            # Read toml configuration from the nodefile and iterator over groups
-            node_toml = toml.load(nodefile)
-            for group in node_toml.keys():
-
-                # update main dictionary with information from node_toml
-                if group in job_toml:
-                    job_toml[group].update(node_toml[group])
-                else:
-                    job_toml[group] = node_toml[group]
+        # merge toml configuration from the list of source files in
+        # job.input, nested tables are merged recursively and merged
+        # results of ancestor nodes are shared across sibling nodes
+        job_toml = lib.MergeTomlFiles(config.job.input)
 
         # start writing the job.input file
         with open(config.job.workdir + os.sep + "job.input", "w") as inputfile:
@@ -84,7 +125,7 @@ def CreateInputFile(config):
             inputfile.write("# job.input generated from config.job.input files\n")
 
             # DEVNOTE (11/03/2023): This replaces the legacy code below.
-            toml.dump(job_toml, inputfile)
+            inputfile.write(lib.DumpToml(job_toml))
 
             # DEVNOTE (11/03/2023): This is loop below was written to sort and indent
             #                       job.input file but was not useful with dealing with
@@ -105,6 +146,12 @@ def CreateInputFile(config):
             #        else:
             #            inputfile.write(f'{" "*2}{variable} = {value}\n')
 
+        __UpdateManifest(config.job.workdir, "job.input", recipe)
+
+        return True
+
+    return False
+
 
 def CreateTargetFile(config):
     """
@@ -123,11 +170,13 @@ def CreateTargetFile(config):
     if targetfile:
         if os.path.exists(targetfile):
 
-            subprocess.run(
-                f"rm -f job.target && ln -s {targetfile} job.target",
-                shell=True,
-                check=True,
-            )
+            # replace existing link in the working directory
+            linkfile = config.job.workdir + os.sep + "job.target"
+
+            if os.path.lexists(linkfile):
+                os.remove(linkfile)
+
+            os.symlink(targetfile, linkfile)
 
         else:
 
@@ -135,7 +184,7 @@ def CreateTargetFile(config):
             raise FileNotFoundError(f"[jobrunner] {targetfile} not present in path")
 
 
-def CreateSubmitFile(config):
+def CreateSubmitFile(config, force=False):
     """
     Create a job.submit file for using values
     from job.submit list define in config
@@ -144,23 +193,59 @@ def CreateSubmitFile(config):
     ---------
     config : Dictionary containing details of the
                 job configuration in directory tree
+
+    force  : Regenerate even if job.manifest shows
+             that job.submit is up to date
+
+    Returns
+    -------
+    regenerated : True if job.submit was written
     """
+    # skip if sources and schedular options have not
+    # changed since job.submit was generated, job.input and
+    # job.target are part of the recipe because of checks below
+    recipe = __GetRecipe(
+        config,
+        config.job.submit,
+        options=list(config.schedular.options),
+        target=bool(config.job.target),
+        input=bool(config.job.input),
+    )
+
+    if not force and __CheckManifest(config.job.workdir, "job.submit", recipe):
+        return False
+
+    # if job.input and job.target used in nodefile.
+    # Make sure they are defined in the directory tree
+    for nodefile in config.job.submit:
+        uses_target, uses_input = __GetReferences(nodefile)
+
+        if uses_target and not config.job.target:
+            raise ValueError(
+                f"[jobrunner]: job.target used in {nodefile} but not defined in Jobfile"
+            )
+
+        if uses_input and not config.job.input:
+            raise ValueError(
+                f"[jobrunner]: job.input used in {nodefile} but not defined in Jobfile"
+            )
+
     # open job.submit in write mode and start populating
-    with open(config.job.workdir + os.sep + "job.submit", "w") as submitfile:
+    with open(config.job.workdir + os.sep + "job.submit", "wb") as submitfile:
 
         # write the header
-        submitfile.write("#!/bin/bash\n")
+        submitfile.write(b"#!/bin/bash\n")
 
         # add commands from schedular.options
-        submitfile.write(f"\n")
+        submitfile.write(b"\n")
         for entry in config.schedular.options:
-            submitfile.write(f"{entry}\n")
+            submitfile.write(f"{entry}\n".encode())
 
         # set -e to return when error is detected
-        submitfile.write("\nset -e\n")
+        submitfile.write(b"\nset -e\n")
 
         # set environment variable to working directory
-        submitfile.write(f'\nexport JobWorkDir="{config.job.workdir}"\n')
+        submitfile.write(f'\nexport JobWorkDir="{config.job.workdir}"\n'.encode())
 
         # add commands from job.submit script and chdir into node
         # directory given by the location of script
@@ -169,32 +254,15 @@ def CreateSubmitFile(config):
             # get node directory from nodefile
             nodedir = os.path.dirname(nodefile)
 
-            # chdir into node directory
-            submitfile.write(f"\ncd {nodedir}\n")
-
-            # add some spaces
-            submitfile.write(f"\n")
-
-            # open nodefile in read mode and start populating contents
-            with open(nodefile, "r") as entry:
-
-                # loop over lines in entry
-                for line in entry:
+            # chdir into node directory and add some spaces
+            submitfile.write(f"\ncd {nodedir}\n\n".encode())
 
-                    # if job.input and job.target used in nodefile.
-                    # Make sure they are defined in the directory tree
-                    if "job.target" in line.split("#")[0] and not config.job.target:
-                        raise ValueError(
-                            f"[jobrunner]: job.target used in {nodefile} but not defined in Jobfile"
-                        )
+            # copy contents of nodefile to submit script
+            __AppendFile(submitfile, nodefile)
 
-                    if "job.input" in line.split("#")[0] and not config.job.input:
-                        raise ValueError(
-                            f"[jobrunner]: job.input used in {nodefile} but not defined in Jobfile"
-                        )
+    __UpdateManifest(config.job.workdir, "job.submit", recipe)
 
-                    # write to submit file if checks passed
-                    submitfile.write(line)
+    return True
 
 
 def RemoveNodeFiles(config, nodedir):
@@ -213,17 +281,11 @@ def RemoveNodeFiles(config, nodedir):
     if nodedir not in node_list:
         raise ValueError(f"Node {nodedir} directory does not exists in tree")
 
-    # chdir into node directory
-    os.chdir(nodedir)
-
     # create an empty list of file to be removed
     remove_list = []
 
     # get the list of files in nodedir
-    nodefile_list = [
-        os.path.abspath(nodefile)
-        for nodefile in next(os.walk("."), (None, None, []))[2]
-    ]
+    nodefile_list = GetNodeFiles(nodedir)
 
     # create a reference file list to test which nodefile should be archived
     ref_list = config.job.clean + [
@@ -231,7 +293,10 @@ def RemoveNodeFiles(config, nodedir):
         nodedir + os.sep + "job.setup",
         nodedir + os.sep + "job.submit",
         nodedir + os.sep + "job.target",
-        nodedir + os.sep + "job.output",
+        *lib.GetOutputFiles(nodedir),
+        nodedir + os.sep + "job.manifest",
+        nodedir + os.sep + "job.fingerprint",
+        nodedir + os.sep + "job.metrics",
     ]
 
     # loop over list of files in nodedir and append to
@@ -246,5 +311,256 @@ def RemoveNodeFiles(config, nodedir):
         for filename in remove_list:
             os.remove(filename)
 
-    # return back to working directory
-    os.chdir(config.job.workdir)
+
+def GetJobFingerprint(config, script):
+    """
+    Get fingerprint of a composed job given by digests of the generated
+    script and its sources, digest of job.input and identity of job.target
+
+    Arguments
+    ---------
+    config : Dictionary containing details of the
+                job configuration in directory tree
+
+    script : Name of the generated script, job.setup or job.submit
+
+    Returns
+    -------
+    fingerprint : Hexadecimal digest
+    """
+    workdir = config.job.workdir
+    nodefile_list = config.job.setup if script == "job.setup" else config.job.submit
+
+    # sources are included since shared steps of setup DAG
+    # are not part of job.setup in the working directory
+    fingerprint = {
+        "version": __ManifestVersion,
+        "script": GetFileDigest(workdir + os.sep + script),
+        "sources": [[nodefile, GetFileDigest(nodefile)] for nodefile in nodefile_list],
+        "input": None,
+        "target": None,
+    }
+
+    if config.job.input and script == "job.submit":
+        fingerprint["input"] = GetFileDigest(workdir + os.sep + "job.input")
+
+    # target is identified by path, modification time and size
+    # to avoid reading large files such as checkpoints
+    if config.job.target and script == "job.submit":
+        target_stat = os.stat(config.job.target)
+        fingerprint["target"] = [
+            os.path.realpath(config.job.target),
+            target_stat.st_mtime_ns,
+            target_stat.st_size,
+        ]
+
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+
+
+def CheckFingerprint(workdir, script, fingerprint):
+    """
+    Check if job.fingerprint records a successful run of a job
+
+    Arguments
+    ---------
+    workdir     : Working directory
+    script      : Name of the script, job.setup or job.submit
+    fingerprint : Fingerprint of the job, see GetJobFingerprint
+
+    Returns
+    -------
+    unchanged : True if the last successful run had the same fingerprint
+    """
+    return __LoadFingerprints(workdir).get(script) == fingerprint
+
+
+def UpdateFingerprint(workdir, script, fingerprint):
+    """
+    Record fingerprint of a job that succeeded in job.fingerprint
+
+    Arguments
+    ---------
+    workdir     : Working directory
+    script      : Name of the script, job.setup or job.submit
+    fingerprint : Fingerprint of the job, see GetJobFingerprint
+    """
+    fingerprint_dict = __LoadFingerprints(workdir)
+    fingerprint_dict[script] = fingerprint
+
+    with open(workdir + os.sep + "job.fingerprint", "w") as fingerprintfile:
+        json.dump(fingerprint_dict, fingerprintfile, indent=2)
+
+
+def GetNodeFiles(nodedir):
+    """
+    Get list of files in a node directory, entries that are
+    not directories including links to files are listed
+
+    Arguments
+    ---------
+    nodedir : path to node directory
+
+    Returns
+    -------
+    nodefile_list : List of absolute paths to files
+    """
+    with os.scandir(nodedir) as entries:
+        return [
+            nodedir + os.sep + entry.name for entry in entries if not entry.is_dir()
+        ]
+
+
+def GetFileDigest(filename):
+    """
+    Get sha256 digest of file contents. Digests are stored
+    for the invocation and reused until the file is modified
+
+    Arguments
+    ---------
+    filename : Path to file
+
+    Returns
+    -------
+    digest : Hexadecimal digest
+    """
+    file_stat = os.stat(filename)
+    key = (filename, file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino)
+
+    if key not in __FileDigests:
+        digest = hashlib.sha256()
+        with open(filename, "rb") as source:
+            for chunk in iter(lambda: source.read(1 << 20), b""):
+                digest.update(chunk)
+
+        __FileDigests[key] = digest.hexdigest()
+
+    return __FileDigests[key]
+
+
+def __GetReferences(nodefile):
+    """
+    Check if a script uses job.target and job.input
+    """
+    digest = GetFileDigest(nodefile)
+
+    if digest not in __FileReferences:
+        with open(nodefile, "rb") as entry:
+            content = entry.read()
+
+        __FileReferences[digest] = (
+            bool(__TargetReference.search(content)),
+            bool(__InputReference.search(content)),
+        )
+
+    return __FileReferences[digest]
+
+
+def __AppendFile(outfile, nodefile):
+    """
+    Append contents of nodefile to an open binary file using
+    copies in the kernel when supported by the platform
+    """
+    # write buffered contents before copying to the file descriptor
+    outfile.flush()
+
+    with open(nodefile, "rb") as entry:
+        size = os.fstat(entry.fileno()).st_size
+        offset = 0
+
+        try:
+            while offset < size:
+                if hasattr(os, "copy_file_range"):
+                    copied = os.copy_file_range(
+                        entry.fileno(), outfile.fileno(), size - offset
+                    )
+                else:
+                    copied = os.sendfile(
+                        outfile.fileno(), entry.fileno(), offset, size - offset
+                    )
+
+                if not copied:
+                    break
+
+                offset += copied
+
+        # fall back to copy in user space
+        except (AttributeError, OSError):
+            pass
+
+        entry.seek(offset)
+        shutil.copyfileobj(entry, outfile)
+
+    # synchronize position of buffered file with the file descriptor
+    outfile.seek(0, os.SEEK_END)
+
+
+def __GetRecipe(config, nodefile_list, **values):
+    """
+    Get digest of sources used to generate a file
+    """
+    recipe = {
+        "version": __ManifestVersion,
+        "workdir": config.job.workdir,
+        "sources": [[nodefile, GetFileDigest(nodefile)] for nodefile in nodefile_list],
+        **values,
+    }
+
+    return hashlib.sha256(json.dumps(recipe, sort_keys=True).encode()).hexdigest()
+
+
+def __LoadManifest(workdir):
+    """
+    Load job.manifest from working directory
+    """
+    try:
+        with open(workdir + os.sep + "job.manifest", "r") as manifest:
+            return json.load(manifest)
+
+    except (OSError, ValueError):
+        return {}
+
+
+def __LoadFingerprints(workdir):
+    """
+    Load job.fingerprint from working directory
+    """
+    try:
+        with open(workdir + os.sep + "job.fingerprint", "r") as fingerprintfile:
+            return json.load(fingerprintfile)
+
+    except (OSError, ValueError):
+        return {}
+
+
+def __CheckManifest(workdir, filename, recipe):
+    """
+    Check if a generated file is up to date using job.manifest, the file
+    should exist and be unmodified since it was generated from recipe
+    """
+    entry = __LoadManifest(workdir).get(filename)
+
+    if not entry or entry["recipe"] != recipe:
+        return False
+
+    try:
+        file_stat = os.stat(workdir + os.sep + filename)
+    except OSError:
+        return False
+
+    return entry["stat"] == [file_stat.st_mtime_ns, file_stat.st_size]
+
+
+def __UpdateManifest(workdir, filename, recipe):
+    """
+    Record recipe of a generated file in job.manifest
+    """
+    manifest = __LoadManifest(workdir)
+
+    file_stat = os.stat(workdir + os.sep + filename)
+    manifest[filename] = {
+        "recipe": recipe,
+        "stat": [file_stat.st_mtime_ns, file_stat.st_size],
+    }
+
+    with open(workdir + os.sep + "job.manifest", "w") as manifestfile:
+        json.dump(manifest, manifestfile, indent=2)
@@ -0,0 +1,231 @@
+# Standard libraries
+import os
+import json
+
+# version of the index format, indices with a different version are stale
+__IndexVersion = 2
+
+# loaded tree indices and directories verified during this invocation
+__TreeIndex = {}
+
+
+def GetIndexPath(basedir):
+    """
+    Get path to the tree index file
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+    """
+    return basedir + os.sep + ".jobrunner" + os.sep + "index"
+
+
+def CreateTreeIndex(basedir):
+    """
+    Walk the directory tree under basedir once and create an index of
+    directories containing a Jobfile along with their ancestor chain,
+    whether they are leaf nodes, and the status of the Jobfile
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+
+    Returns
+    -------
+    index : Dictionary containing modification time of scanned
+            directories and details of directories with a Jobfile
+    """
+    # create directory for the index before scanning so that
+    # modification time of basedir is not changed afterwards
+    os.makedirs(os.path.dirname(GetIndexPath(basedir)), exist_ok=True)
+
+    # create an empty index, paths are stored relative to basedir
+    index = {"version": __IndexVersion, "basedir": basedir, "dirs": {}, "nodes": {}}
+
+    # stack of directories to scan along with list of
+    # ancestor directories that contain a Jobfile
+    dir_stack = [("", [])]
+
+    while dir_stack:
+        reldir, ancestors = dir_stack.pop()
+        nodedir = basedir + os.sep + reldir if reldir else basedir
+
+        try:
+            index["dirs"][reldir] = os.stat(nodedir).st_mtime_ns
+            entries = list(os.scandir(nodedir))
+        except OSError:
+            continue
+
+        # check for Jobfile in current directory and store its status,
+        # which is used to verify the node instead of the directory
+        # modification time that changes when jobs write their output
+        jobfile = [
+            entry for entry in entries if entry.name == "Jobfile" and entry.is_file()
+        ]
+
+        if jobfile:
+            index["nodes"][reldir] = {
+                "ancestors": ancestors.copy(),
+                "leaf": True,
+                "jobfile": __GetJobfileKey(jobfile[0].stat()),
+            }
+
+            for ancestor in ancestors:
+                index["nodes"][ancestor]["leaf"] = False
+
+            ancestors = ancestors + [reldir]
+
+        # add sub-directories to the stack while skipping hidden
+        # directories, archives, and symbolic links
+        for entry in entries:
+            if (
+                entry.name.startswith(".")
+                or entry.name == "jobnode.archive"
+                or not entry.is_dir(follow_symlinks=False)
+            ):
+                continue
+
+            dir_stack.append(
+                (reldir + os.sep + entry.name if reldir else entry.name, ancestors)
+            )
+
+    # write index to file
+    with open(GetIndexPath(basedir) + f".{os.getpid()}", "w") as indexfile:
+        json.dump(index, indexfile)
+    os.replace(GetIndexPath(basedir) + f".{os.getpid()}", GetIndexPath(basedir))
+
+    # reset index loaded during this invocation
+    __TreeIndex.pop(basedir, None)
+
+    return index
+
+
+def QueryTreeIndex(basedir, nodedir):
+    """
+    Check if a directory contains a Jobfile using the tree index
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+    nodedir : Path to directory
+
+    Returns
+    -------
+    status : True or False if the directory is present in a fresh
+             index, None if the index is not available or stale
+    """
+    index, verified = __LoadTreeIndex(basedir)
+
+    if not index:
+        return None
+
+    reldir = os.path.relpath(nodedir, basedir)
+    reldir = "" if reldir == os.curdir else reldir
+
+    if not __VerifyTreeIndex(basedir, index, verified, reldir):
+        return None
+
+    return reldir in index["nodes"]
+
+
+def GetIndexedNodeList(basedir, workdir):
+    """
+    Get directories containing a Jobfile between basedir and workdir
+    from the ancestor chain of workdir in the tree index
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+    workdir : Path to a directory containing a Jobfile
+
+    Returns
+    -------
+    node_list : List of (nodedir, jobfile_stat) for each directory
+                containing a Jobfile starting from basedir, None if
+                workdir is not in the index or the index is stale
+    """
+    index, verified = __LoadTreeIndex(basedir)
+
+    if not index:
+        return None
+
+    reldir = os.path.relpath(workdir, basedir)
+    reldir = "" if reldir == os.curdir else reldir
+
+    if reldir not in index["nodes"]:
+        return None
+
+    # verify every level between basedir and workdir, so that a
+    # Jobfile added to an intermediate directory is not missed
+    level_list = [""]
+    if reldir:
+        for level in reldir.split(os.sep):
+            level_list.append(os.path.join(level_list[-1], level))
+
+    if not all(
+        __VerifyTreeIndex(basedir, index, verified, level) for level in level_list
+    ):
+        return None
+
+    return [
+        (basedir + os.sep + node if node else basedir, verified[node])
+        for node in index["nodes"][reldir]["ancestors"] + [reldir]
+    ]
+
+
+def __VerifyTreeIndex(basedir, index, verified, reldir):
+    """
+    Check that the index entry of a directory is fresh. Directories with a
+    Jobfile are verified using the status of the Jobfile, which is stored
+    for reuse, and other directories using their modification time.
+    Directories are verified only once during the invocation
+    """
+    if reldir not in verified:
+        nodedir = basedir + os.sep + reldir if reldir else basedir
+
+        try:
+            if reldir in index["nodes"]:
+                jobfile_stat = os.stat(nodedir + os.sep + "Jobfile")
+
+                if __GetJobfileKey(jobfile_stat) == index["nodes"][reldir]["jobfile"]:
+                    verified[reldir] = jobfile_stat
+                else:
+                    verified[reldir] = False
+
+            else:
+                verified[reldir] = os.stat(nodedir).st_mtime_ns == index["dirs"].get(
+                    reldir
+                )
+
+        except OSError:
+            verified[reldir] = False
+
+    return verified[reldir] is not False
+
+
+def __GetJobfileKey(jobfile_stat):
+    """
+    Get values from the status of a Jobfile that identify its contents
+    """
+    return [jobfile_stat.st_mtime_ns, jobfile_stat.st_size, jobfile_stat.st_ino]
+
+
+def __LoadTreeIndex(basedir):
+    """
+    Load tree index for a base directory once during the invocation
+    """
+    if basedir not in __TreeIndex:
+
+        try:
+            with open(GetIndexPath(basedir), "r") as indexfile:
+                index = json.load(indexfile)
+
+            if (index.get("version"), index["basedir"]) != (__IndexVersion, basedir):
+                index = None
+
+        except (OSError, ValueError, KeyError, AttributeError):
+            index = None
+
+        __TreeIndex[basedir] = (index, {})
+
+    return __TreeIndex[basedir]
@@ -0,0 +1,241 @@
+# Standard libraries
+import os
+import json
+import time
+import atexit
+import threading
+
+# states of a working directory after which it is not run again on resume
+__DoneStates = ("submitted", "succeeded", "unchanged")
+
+
+def GetRunsDir(basedir):
+    """
+    Get path to the directory with journals of runs
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+    """
+    return basedir + os.sep + ".jobrunner" + os.sep + "runs"
+
+
+class RunJournal:
+    """
+    Class RunJournal for an append-only journal of state transitions of
+    working directories during a run. Each record is written to the file
+    as soon as it is made, so it survives termination of jobrunner, and
+    records are synced to disk in batches to survive a reboot of the node
+    without paying for a sync on every record
+    """
+
+    # records and seconds between syncs to disk
+    sync_count = 64
+    sync_interval = 1.0
+
+    def __init__(self, basedir, runid=None, command=None, options=None, dirlist=()):
+        """
+        Constructor, creates a new run if runid is None or opens the
+        journal of an existing run to continue it
+
+        Arguments
+        ---------
+        basedir : Base directory (top level) of a project
+        runid   : ID of an existing run
+        command : Command of a new run, setup or submit
+        options : Dictionary of options of a new run
+        dirlist : List of working directories of a new run
+        """
+        self.basedir = basedir
+
+        if runid is None:
+            runid = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+            self.rundir = GetRunsDir(basedir) + os.sep + runid
+            os.makedirs(self.rundir)
+
+            with open(self.rundir + os.sep + "run.json", "w") as runfile:
+                json.dump(
+                    {
+                        "command": command,
+                        "options": options or {},
+                        "dirlist": [
+                            os.path.relpath(workdir, basedir) for workdir in dirlist
+                        ],
+                    },
+                    runfile,
+                    indent=2,
+                )
+
+        else:
+            self.rundir = GetRunsDir(basedir) + os.sep + runid
+
+        self.runid = runid
+
+        self.__journal = open(self.rundir + os.sep + "journal.jsonl", "a")
+        self.__lock = threading.Lock()
+        self.__pending = 0
+        self.__synced = time.monotonic()
+
+        # sync remaining records if jobrunner exits with an error
+        atexit.register(self.Close)
+
+    def Record(self, workdir, state, jobid=None):
+        """
+        Append a state transition of a working directory
+
+        Arguments
+        ---------
+        workdir : Working directory
+        state   : composed, unchanged, started, submitted, succeeded,
+                  failed, skipped or cancelled
+        jobid   : Job ID reported by the schedular for submitted state
+        """
+        record = {
+            "time": round(time.time(), 3),
+            "workdir": os.path.relpath(workdir, self.basedir),
+            "state": state,
+        }
+
+        if jobid is not None:
+            record["jobid"] = jobid
+
+        with self.__lock:
+            self.__journal.write(json.dumps(record) + "\n")
+            self.__journal.flush()
+            self.__pending += 1
+
+            if (
+                self.__pending >= self.sync_count
+                or time.monotonic() - self.__synced >= self.sync_interval
+            ):
+                self.__Sync()
+
+    def Close(self):
+        """
+        Sync remaining records to disk and close the journal
+        """
+        with self.__lock:
+            if not self.__journal.closed:
+                self.__Sync()
+                self.__journal.close()
+
+    def __Sync(self):
+        """
+        Sync records written since the last sync to disk
+        """
+        if self.__pending:
+            os.fsync(self.__journal.fileno())
+
+        self.__pending = 0
+        self.__synced = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.Close()
+
+
+def GetRunList(basedir):
+    """
+    Get IDs of runs with a journal, oldest first
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+
+    Returns
+    -------
+    runid_list : List of run IDs
+    """
+    try:
+        with os.scandir(GetRunsDir(basedir)) as entries:
+            runid_list = [
+                entry.name
+                for entry in entries
+                if os.path.isfile(entry.path + os.sep + "run.json")
+            ]
+
+    except OSError:
+        return []
+
+    return sorted(
+        runid_list,
+        key=lambda runid: os.stat(
+            GetRunsDir(basedir) + os.sep + runid + os.sep + "run.json"
+        ).st_mtime,
+    )
+
+
+def LoadRunJournal(basedir, runid):
+    """
+    Load a run and the last recorded state of its working directories,
+    an incomplete last line left by an interrupted write is ignored
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+    runid   : ID of the run
+
+    Returns
+    -------
+    run       : Dictionary with command, options and dirlist of the run,
+                dirlist contains absolute paths
+    state_dict: Dictionary of last record for each working directory
+    """
+    rundir = GetRunsDir(basedir) + os.sep + runid
+
+    try:
+        with open(rundir + os.sep + "run.json", "r") as runfile:
+            run = json.load(runfile)
+
+    except OSError:
+        raise ValueError(
+            f'[jobrunner] Run "{runid}" not found in {GetRunsDir(basedir)}'
+        )
+
+    run["dirlist"] = [
+        os.path.normpath(os.path.join(basedir, workdir)) for workdir in run["dirlist"]
+    ]
+
+    state_dict = {}
+
+    try:
+        with open(rundir + os.sep + "journal.jsonl", "r") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+
+                state_dict[
+                    os.path.normpath(os.path.join(basedir, record["workdir"]))
+                ] = record
+
+    except OSError:
+        pass
+
+    return run, state_dict
+
+
+def GetPendingWorkDirs(run, state_dict):
+    """
+    Get working directories of a run that should run again on resume,
+    those without a record or that did not get past composed, started
+    or failed. Submitted jobs are not submitted again to avoid
+    duplicates in the schedular queue
+
+    Arguments
+    ---------
+    run        : Dictionary of the run, see LoadRunJournal
+    state_dict : Dictionary of last record for each working directory
+
+    Returns
+    -------
+    pending_list : List of working directories
+    """
+    return [
+        workdir
+        for workdir in run["dirlist"]
+        if state_dict.get(workdir, {}).get("state") not in __DoneStates
+    ]
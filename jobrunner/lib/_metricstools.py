@@ -0,0 +1,84 @@
+# Standard libraries
+import os
+import json
+
+# directories that do not contain working directories
+__SkipDirs = (".jobrunner", "jobnode.archive")
+
+
+def WriteJobMetrics(workdir, script, metrics):
+    """
+    Record resource usage of a script in job.metrics of its working
+    directory, entries of other scripts in the file are kept
+
+    Arguments
+    ---------
+    workdir : Working directory
+    script  : Name of the script, job.setup or job.submit
+    metrics : Dictionary of resource usage, see WaitProcess
+    """
+    if metrics is None:
+        return
+
+    metrics_dict = LoadJobMetrics(workdir)
+    metrics_dict[script] = metrics
+
+    with open(workdir + os.sep + "job.metrics", "w") as metricsfile:
+        json.dump(metrics_dict, metricsfile, indent=2)
+
+
+def LoadJobMetrics(workdir):
+    """
+    Load job.metrics from working directory
+
+    Arguments
+    ---------
+    workdir : Working directory
+
+    Returns
+    -------
+    metrics_dict : Dictionary of resource usage for each script
+    """
+    try:
+        with open(workdir + os.sep + "job.metrics", "r") as metricsfile:
+            return json.load(metricsfile)
+
+    except (OSError, ValueError):
+        return {}
+
+
+def FindJobMetrics(dirlist):
+    """
+    Walk directory trees and collect job.metrics of working directories,
+    archives and the .jobrunner directory are not searched
+
+    Arguments
+    ---------
+    dirlist : List of directories to search
+
+    Returns
+    -------
+    metrics_list : List of (workdir, script, metrics) for each entry
+    """
+    metrics_list = []
+    visited = set()
+
+    for topdir in dirlist:
+        for workdir, subdirs, files in os.walk(topdir):
+
+            # prune directories in place to skip them during walk
+            subdirs[:] = sorted(
+                subdir
+                for subdir in subdirs
+                if subdir not in __SkipDirs and not subdir.startswith(".")
+            )
+
+            if "job.metrics" not in files or workdir in visited:
+                continue
+
+            visited.add(workdir)
+
+            for script, metrics in sorted(LoadJobMetrics(workdir).items()):
+                metrics_list.append((workdir, script, metrics))
+
+    return metrics_list
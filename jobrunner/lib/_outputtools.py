@@ -0,0 +1,519 @@
+# Standard libraries
+import io
+import os
+import sys
+import gzip
+import time
+import atexit
+import asyncio
+import threading
+from collections import deque
+
+# Feature libraries
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# local imports
+from jobrunner import lib
+
+# codecs to compress job.output stored as suffix of the
+# compressed file and functions to open it for writing and reading
+__OutputCodecs = {
+    "gzip": (
+        ".gz",
+        lambda filename: gzip.open(filename, "wb", compresslevel=6),
+        lambda filename: gzip.open(filename, "rb"),
+    ),
+}
+
+if zstandard:
+    __OutputCodecs["zstd"] = (
+        ".zst",
+        lambda filename: zstandard.ZstdCompressor().stream_writer(open(filename, "wb")),
+        lambda filename: zstandard.ZstdDecompressor().stream_reader(
+            open(filename, "rb")
+        ),
+    )
+
+# codec used to write job.output, None to write plain text
+__OutputCodec = {"name": None}
+
+# size of chunks read from pipes and files
+__ChunkSize = 1 << 16
+
+# multiplexer shared by processes with compressed output
+__Multiplexer = {"default": None}
+
+
+def RegisterOutputCodec(name, suffix, writer, reader):
+    """
+    Register a codec to compress job.output
+
+    Arguments
+    ---------
+    name   : Name of the codec
+    suffix : Suffix of compressed file, like ".gz"
+    writer : Function that opens a file name for writing binary data
+    reader : Function that opens a file name for reading binary data
+    """
+    __OutputCodecs[name] = (suffix, writer, reader)
+
+
+def SetOutputCodec(name=None):
+    """
+    Select codec used to compress job.output as it is written
+
+    Arguments
+    ---------
+    name : Name of the codec, "gzip" or "zstd", None or "none"
+           to write plain text
+    """
+    if name in (None, "", "none"):
+        __OutputCodec["name"] = None
+        return
+
+    if name not in __OutputCodecs:
+        raise ValueError(
+            f"[jobrunner] output codec {name} not in "
+            + f"available codecs {list(__OutputCodecs.keys())}"
+        )
+
+    __OutputCodec["name"] = name
+
+
+def GetOutputCodec(name=None):
+    """
+    Get suffix, writer and reader of a codec
+
+    Arguments
+    ---------
+    name : Name of the codec, selected codec if None
+
+    Returns
+    -------
+    codec : Tuple of (suffix, writer, reader), None for plain text
+    """
+    name = name or __OutputCodec["name"]
+    return __OutputCodecs[name] if name else None
+
+
+def GetOutputFiles(workdir):
+    """
+    Get paths of plain and compressed job.output in a working directory,
+    used to archive and clean output written with any codec
+
+    Arguments
+    ---------
+    workdir : Working directory
+
+    Returns
+    -------
+    output_list : List of paths
+    """
+    return [
+        workdir + os.sep + "job.output" + suffix
+        for suffix in ["", *[codec[0] for codec in __OutputCodecs.values()]]
+    ]
+
+
+def FindOutputFile(workdir):
+    """
+    Find the most recent job.output in a working directory
+
+    Arguments
+    ---------
+    workdir : Working directory
+
+    Returns
+    -------
+    outputfile : Path to job.output, None if not present
+    """
+    output_list = [
+        (os.stat(outputfile).st_mtime_ns, outputfile)
+        for outputfile in GetOutputFiles(workdir)
+        if os.path.isfile(outputfile)
+    ]
+
+    return max(output_list)[1] if output_list else None
+
+
+def OpenOutputFile(outputfile):
+    """
+    Open job.output for reading binary data, compressed
+    files are decompressed based on their suffix
+
+    Arguments
+    ---------
+    outputfile : Path to job.output
+    """
+    for suffix, writer, reader in __OutputCodecs.values():
+        if outputfile.endswith(suffix):
+            return reader(outputfile)
+
+    return open(outputfile, "rb")
+
+
+def PrintOutputFile(outputfile):
+    """
+    Print job.output on console in chunks, so that
+    large files are not read into memory at once
+
+    Arguments
+    ---------
+    outputfile : Path to job.output
+    """
+    last = "\n"
+
+    with io.TextIOWrapper(OpenOutputFile(outputfile), errors="replace") as output:
+        for chunk in iter(lambda: output.read(__ChunkSize), ""):
+            print(chunk, end="")
+            last = chunk[-1]
+
+    if last != "\n":
+        print()
+
+
+def TailFile(outputfile, lines=8):
+    """
+    Get last lines of job.output. Plain files are read backwards from
+    the end, and compressed files are streamed keeping the last lines
+
+    Arguments
+    ---------
+    outputfile : Path to job.output
+    lines      : Number of lines
+
+    Returns
+    -------
+    line_list : List of lines without line endings
+    """
+    if outputfile.endswith("job.output"):
+        with open(outputfile, "rb") as output:
+            position = output.seek(0, os.SEEK_END)
+            content = b""
+
+            # read blocks from the end until there are enough lines
+            while position > 0 and content.count(b"\n") <= lines:
+                size = min(__ChunkSize, position)
+                position -= size
+                output.seek(position)
+                content = output.read(size) + content
+
+        return [line.decode(errors="replace") for line in content.splitlines()[-lines:]]
+
+    buffer = TailBuffer(lines)
+
+    with OpenOutputFile(outputfile) as output:
+        for chunk in iter(lambda: output.read(__ChunkSize), b""):
+            buffer.Write(chunk)
+
+    return buffer.Lines()
+
+
+class TailBuffer:
+    """
+    Class TailBuffer for a ring buffer of the last lines written to
+    a stream, memory is bounded by the number of lines and length
+    of lines kept
+    """
+
+    # longest line kept, longer lines are truncated at the front
+    max_length = 1 << 16
+
+    def __init__(self, lines=8):
+        """
+        Constructor
+
+        Arguments
+        ---------
+        lines : Number of lines to keep
+        """
+        self.lines = lines
+        self.ring = deque(maxlen=lines)
+        self.partial = b""
+
+    def Write(self, chunk):
+        """
+        Add a chunk of data, only the last lines of a chunk are split
+        """
+        pieces = (self.partial + chunk).rsplit(b"\n", self.lines)
+        self.partial = pieces.pop()[-self.max_length :]
+
+        if pieces:
+            # first piece holds all lines before the last ones
+            pieces[0] = pieces[0].rsplit(b"\n", 1)[-1]
+            self.ring.extend(piece[-self.max_length :] for piece in pieces)
+
+    def Lines(self):
+        """
+        Get last lines without line endings
+        """
+        line_list = list(self.ring)
+        if self.partial:
+            line_list.append(self.partial)
+
+        return [line.decode(errors="replace") for line in line_list[-self.lines :]]
+
+
+class OutputMultiplexer:
+    """
+    Class OutputMultiplexer for an asyncio event loop that reads output of
+    processes from pipes on a single thread. Output of each process is
+    written to its job.output, and lines can be shown on console tagged
+    with the name of the process at a limited rate
+    """
+
+    def __init__(self, echo=False, rate=20.0, burst=40):
+        """
+        Constructor, starts the event loop in a thread
+
+        Arguments
+        ---------
+        echo  : Show lines on console
+        rate  : Lines shown per second across all processes
+        burst : Lines that can be shown at once after a quiet period
+        """
+        self.echo = echo
+        self.rate = rate
+        self.burst = burst
+
+        # tokens of the rate limiter
+        self.tokens = burst
+        self.refilled = time.monotonic()
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def Add(self, read_fd, output, buffer, tag=""):
+        """
+        Read output of a process from a pipe
+
+        Arguments
+        ---------
+        read_fd : Read end of the pipe
+        output  : File open for writing binary data, closed at the end
+        buffer  : TailBuffer to keep the last lines
+        tag     : Name of the process shown on console
+
+        Returns
+        -------
+        future : Future that completes when all writers close the pipe
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self.Read(read_fd, output, buffer, tag), self.loop
+        )
+
+    async def Read(self, read_fd, output, buffer, tag):
+        """
+        Coroutine to read a pipe until all writers close it
+        """
+        reader = asyncio.StreamReader()
+        transport, protocol = await self.loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader),
+            open(read_fd, "rb", buffering=0),
+        )
+
+        # partial line and number of lines not shown
+        state = {"partial": b"", "hidden": 0}
+
+        try:
+            while True:
+                chunk = await reader.read(1 << 16)
+                if not chunk:
+                    break
+
+                output.write(chunk)
+                buffer.Write(chunk)
+
+                if self.echo:
+                    self.Echo(tag, state, chunk)
+
+        finally:
+            transport.close()
+            output.close()
+
+        if self.echo:
+            self.Echo(tag, state, b"", final=True)
+
+    def Echo(self, tag, state, chunk, final=False):
+        """
+        Show complete lines of a chunk on console while the rate limit
+        allows, lines that are not shown are counted and reported
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+
+        content = state["partial"] + chunk
+
+        # count lines without splitting when none can be shown
+        if self.tokens < 1 and not final:
+            state["hidden"] += content.count(b"\n")
+            state["partial"] = content.rsplit(b"\n", 1)[-1][-TailBuffer.max_length :]
+            return
+
+        line_list = content.split(b"\n")
+        state["partial"] = b"" if final else line_list.pop()[-TailBuffer.max_length :]
+
+        for line in line_list:
+            if final and not line:
+                continue
+
+            if self.tokens < 1 and not final:
+                state["hidden"] += 1
+                continue
+
+            self.tokens -= 1
+
+            if state["hidden"]:
+                self.Print(tag, f'... {state["hidden"]} lines not shown')
+                state["hidden"] = 0
+
+            self.Print(tag, line.decode(errors="replace"))
+
+        if final and state["hidden"]:
+            self.Print(tag, f'... {state["hidden"]} lines not shown')
+
+    def Print(self, tag, text):
+        """
+        Print a tagged line with a single write, so that lines
+        are not interleaved with output of other threads
+        """
+        sys.stdout.write(f"{lib.Color.purple}[{tag}]{lib.Color.end} {text}\n")
+        sys.stdout.flush()
+
+    def Close(self):
+        """
+        Stop the event loop and its thread, pipes that are still being
+        read are closed along with their output so that compressed
+        output is complete
+        """
+        if self.loop.is_closed():
+            return
+
+        asyncio.run_coroutine_threadsafe(self.Cancel(), self.loop).result()
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    async def Cancel(self):
+        """
+        Coroutine to cancel reads of pipes and wait for them to close
+        """
+        task_list = [
+            task for task in asyncio.all_tasks() if task is not asyncio.current_task()
+        ]
+
+        for task in task_list:
+            task.cancel()
+
+        await asyncio.gather(*task_list, return_exceptions=True)
+
+
+def GetOutputMultiplexer():
+    """
+    Get the multiplexer shared by processes that write compressed
+    output without showing it on console, created on first use
+    """
+    if __Multiplexer["default"] is None:
+        __Multiplexer["default"] = OutputMultiplexer()
+        atexit.register(__CloseOutputMultiplexer)
+
+    return __Multiplexer["default"]
+
+
+def __CloseOutputMultiplexer():
+    """
+    Close the shared multiplexer at exit so that its thread does
+    not stop while compressed output is being written
+    """
+    if __Multiplexer["default"] is not None:
+        __Multiplexer["default"].Close()
+        __Multiplexer["default"] = None
+
+
+class OutputCapture:
+    """
+    Class OutputCapture for job.output of a process in a working directory.
+    The process writes to the file directly unless output is compressed or
+    shown on console, in which case output is read from a pipe by an
+    OutputMultiplexer that keeps the last lines in a TailBuffer
+    """
+
+    def __init__(self, workdir, lines=8, multiplexer=None, tag=""):
+        """
+        Constructor, stdout is passed as stdout of the process
+
+        Arguments
+        ---------
+        workdir     : Working directory
+        lines       : Number of lines kept for Tail
+        multiplexer : OutputMultiplexer to show output on console
+        tag         : Name of the process shown on console
+        """
+        self.codec = GetOutputCodec()
+        self.lines = lines
+        self.outputfile = workdir + os.sep + "job.output"
+
+        if self.codec:
+            self.outputfile += self.codec[0]
+
+        # remove output of previous runs written with other codecs
+        for outputfile in GetOutputFiles(workdir):
+            if outputfile != self.outputfile and os.path.exists(outputfile):
+                os.remove(outputfile)
+
+        if not self.codec and multiplexer is None:
+            self.stdout = open(self.outputfile, "wb")
+            self.buffer = None
+            self.future = None
+            return
+
+        if multiplexer is None:
+            multiplexer = GetOutputMultiplexer()
+
+        if self.codec:
+            output = self.codec[1](self.outputfile)
+        else:
+            output = open(self.outputfile, "wb")
+
+        self.buffer = TailBuffer(lines)
+        read_fd, self.stdout = os.pipe()
+        self.future = multiplexer.Add(read_fd, output, self.buffer, tag)
+
+    def Close(self):
+        """
+        Close the file or the write end of the pipe, and wait for the
+        multiplexer to write remaining output after the process exits
+        """
+        if self.future is None:
+            self.stdout.close()
+            return
+
+        if self.stdout is not None:
+            os.close(self.stdout)
+            self.stdout = None
+            self.future.result()
+
+    def Tail(self):
+        """
+        Get last lines of output
+        """
+        if self.buffer is not None:
+            return self.buffer.Lines()
+
+        return TailFile(self.outputfile, self.lines)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.Close()
+
+
+# default can be changed using environment variable
+SetOutputCodec(os.getenv("JOBRUNNER_OUTPUT_CODEC"))
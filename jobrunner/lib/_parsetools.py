@@ -1,27 +1,29 @@
 # Standard libraries
 import os
-import glob
-from types import SimpleNamespace
+import re
+import sys
 
 # Feature libraries
 import toml
 import yaml
 
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+from jobrunner import lib
 from jobrunner import options
 
 
-class __YamlLoader(yaml.SafeLoader):
+class __DuplicateKeyConstructor:
     """
-    Class YamlLoader for YAML
+    Class DuplicateKeyConstructor for YAML loaders
     """
 
-    def __init__(self, stream):
-        """
-        Constructor
-        """
-        super().__init__(stream)
-        self._stream = stream
-
     def construct_mapping(self, node, deep=False):
         """
         Mapping function
@@ -30,187 +32,537 @@ class __YamlLoader(yaml.SafeLoader):
         for key_node, value_node in node.value:
             key = self.construct_object(key_node, deep=deep)
             if key in mapping:
-                print(f"ERROR:   Duplicate {key!r} key found in {self._stream.name!r}.")
+                print(f"ERROR:   Duplicate {key!r} key found in {self.name!r}.")
                 raise ValueError()
             mapping.add(key)
         return super().construct_mapping(node, deep)
 
 
-def ParseJobConfig(basedir, workdir):
+class __YamlLoader(__DuplicateKeyConstructor, yaml.SafeLoader):
     """
-    basedir : base directory
-    workdir : work directory
+    Class YamlLoader for YAML
     """
 
-    if basedir not in workdir:
-        raise ValueError(f"[jobrunner] {workdir} not a sub-directory of {basedir}")
 
-    # build a list of all toml files in a directory tree between basedir and workdir
-    jobfile_list = GetNodeList(basedir, workdir, node_object="Jobfile")
+# parsers available for toml and yaml formats
+__TomlBackends = {"toml": toml.loads}
+__YamlBackends = {"pyyaml": __YamlLoader}
 
-    # create an empty dictionary to set default values for configuration variables
-    config = {
-        "instrument": "",
-        "schedular": {
-            "command": "",
-            "options": [],
-        },
-        "job": {
-            "input": [],
-            "target": "",
-            "submit": [],
-            "setup": [],
-            "clean": [],
-            "archive": [],
-            "basedir": basedir,
-            "workdir": workdir,
+if tomllib:
+    __TomlBackends["tomllib"] = tomllib.loads
+
+if yaml.__with_libyaml__:
+
+    class __CYamlLoader(__DuplicateKeyConstructor, yaml.CSafeLoader):
+        """
+        Class CYamlLoader for YAML using libyaml
+        """
+
+    __YamlBackends["libyaml"] = __CYamlLoader
+
+# select fast backends by default
+__JobfileBackend = {
+    "toml": "tomllib" if "tomllib" in __TomlBackends else "toml",
+    "yaml": "libyaml" if "libyaml" in __YamlBackends else "pyyaml",
+}
+
+
+def SetJobfileBackend(toml_backend=None, yaml_backend=None):
+    """
+    Select parsers used to read Jobfiles
+
+    Arguments
+    ---------
+    toml_backend : Parser for toml format, "tomllib" or "toml"
+    yaml_backend : Parser for yaml format, "libyaml" or "pyyaml"
+    """
+    if toml_backend:
+        if toml_backend not in __TomlBackends:
+            raise ValueError(
+                f"[jobrunner] toml backend {toml_backend} not in "
+                + f"available backends {list(__TomlBackends.keys())}"
+            )
+        __JobfileBackend["toml"] = toml_backend
+
+    if yaml_backend:
+        if yaml_backend not in __YamlBackends:
+            raise ValueError(
+                f"[jobrunner] yaml backend {yaml_backend} not in "
+                + f"available backends {list(__YamlBackends.keys())}"
+            )
+        __JobfileBackend["yaml"] = yaml_backend
+
+
+def GetJobfileBackend():
+    """
+    Get parsers used to read Jobfiles along with available parsers
+
+    Returns
+    -------
+    backends : Dictionary with selected and available backends
+    """
+    return {
+        "toml": __JobfileBackend["toml"],
+        "yaml": __JobfileBackend["yaml"],
+        "available": {
+            "toml": list(__TomlBackends.keys()),
+            "yaml": list(__YamlBackends.keys()),
         },
     }
 
-    # loop over individual files
-    for jobfile in jobfile_list:
 
-        # load the job configuration both toml and yaml formats supported
-        # try toml load
-        try:
-            work_dict = toml.load(jobfile)
+# defaults can be changed using environment variables
+SetJobfileBackend(
+    os.getenv("JOBRUNNER_TOML_BACKEND"), os.getenv("JOBRUNNER_YAML_BACKEND")
+)
 
-        # if error try yaml load
-        except:
-            with open(jobfile, "r") as stream:
-                try:
-                    work_dict = yaml.load(stream, Loader=__YamlLoader)
-                except yaml.YAMLError as exc:
-                    print(exc)
+# pattern for key-value pairs in toml format
+__TomlKeyValue = re.compile(r"""^[\w"'][\w"'. -]*=""")
 
-        # loop over keys in work_dict, parse configuration and handle exceptions
-        for key in work_dict:
+# pattern and units in MB for memory requests
+__MemoryValue = re.compile(r"^(\d+(?:\.\d+)?)\s*([KMGTkmgt]?)[Bb]?$")
+__MemoryUnits = {"K": 1 / 1024, "M": 1, "G": 1024, "T": 1024 * 1024}
 
-            if key == "instrument":
-                # some checks to enforce design consistency
-                if isinstance(work_dict[key], list):
-                    raise ValueError(f"[jobrunner] {key} cannot be a list")
+# patterns and units in seconds for wall-clock limits
+__TimeoutValue = re.compile(r"^(\d+(?:\.\d+)?)\s*([smhd]?)$")
+__TimeoutClock = re.compile(r"^(?:(?:(\d+):)?(\d+):)?(\d+)$")
+__TimeoutUnits = {"s": 1, "m": 60, "h": 3600, "d": 86400}
 
-                # check if main dictionary already contains definitions for instrument
-                if config[key]:
-                    raise ValueError(
-                        f"[jobrunner] Found duplicates for {key} in directory tree"
-                    )
 
-                # set values if instrument not already set
-                if options.INSTRUMENTS == 1:
-                    config[key] = work_dict[key]
+def ParseJobConfig(basedir, workdir, cache=None):
+    """
+    basedir : base directory
+    workdir : work directory
+    cache   : dictionary of merged configurations for directory nodes,
+              shared between calls to avoid parsing a Jobfile more
+              than once when resolving multiple working directories
+    """
 
-                else:
-                    raise NotImplementedError(
-                        "[jobrunner] Not configured with instruments. Please reinstall with releveant options"
-                    )
+    if basedir not in workdir:
+        raise ValueError(f"[jobrunner] {workdir} not a sub-directory of {basedir}")
 
-                continue
-
-            # loop over subkey and values
-            for subkey, work_obj in work_dict[key].items():
-
-                # test combination of values here to get absolute path for setup and submit scripts
-                if f"{key}.{subkey}" in [
-                    "job.setup",
-                    "job.submit",
-                    "job.input",
-                ]:
-
-                    # convert to a list if single entry
-                    if not isinstance(work_obj, list):
-                        raise ValueError(f"[jobrunner] {key}.{subkey} should be a list")
-
-                    # set absolute paths
-                    work_obj = [
-                        os.path.dirname(jobfile) + os.sep + value for value in work_obj
-                    ]
-
-                    # check paths and raise error as appropriate
-                    # for value in work_obj:
-                    #    if not os.path.exists(value):
-                    #        raise ValueError(f"[jobrunner]: {value} does not exist")
-
-                # absolute path for job.target
-                if f"{key}.{subkey}" in [
-                    "job.target",
-                ]:
-                    # some checks to enforce design consistency
-                    if isinstance(work_obj, list):
-                        raise ValueError(f"[jobrunner] {key}.{subkey} cannot be a list")
-
-                    work_obj = os.path.dirname(jobfile) + os.sep + work_obj
-
-                    # check paths and raise error as appropriate
-                    # if not os.path.exists(work_obj):
-                    #    raise ValueError(f"[jobrunner]: {work_obj} does not exist")
-
-                if f"{key}.{subkey}" in [
-                    "job.archive",
-                    "job.clean",
-                ]:
-                    # convert to a list
-                    # if single entry
-                    if not isinstance(work_obj, list):
-                        raise ValueError(f"[jobrunner] {key}.{subkey} should be a list")
-
-                    # set absolute paths
-                    work_obj = [
-                        os.path.dirname(jobfile) + os.sep + value for value in work_obj
-                    ]
-
-                    temp_obj = []
-                    for value in work_obj:
-                        temp_obj.extend(glob.glob(value))
-
-                    work_obj = [*set(temp_obj)]
-
-                # test combination of values here to handle exceptions
-                if f"{key}.{subkey}" in [
-                    "schedular.command",
-                    "job.target",
-                ]:
-
-                    # some checks to enforce design consistency
-                    if isinstance(work_obj, list):
-                        raise ValueError(f"[jobrunner] {key}.{subkey} cannot be a list")
-
-                    # check if main dictionary already contains definitions for [key][subkey]
-                    # and enforce design requirements
-                    if config[key][subkey]:
-                        raise ValueError(
-                            f"[jobrunner] Found duplicates for {key}.{subkey} in directory tree"
-                        )
-
-                    # set values if [key][subkey] not already set
-                    config[key][subkey] = work_obj
-
-                else:
-                    # extend main dictionary
-                    config[key][subkey].extend(work_obj)
+    # create an empty cache if one is not supplied by the caller
+    if cache is None:
+        cache = {}
+
+    # create a configuration with default values for configuration variables
+    config = lib.JobConfig(
+        instrument="",
+        schedular=lib.SchedularSection(
+            command="",
+            options=lib.NodeList(),
+            backend="",
+            max_inflight=0,
+            cores=0,
+            memory=0,
+            gpus=0,
+            timeout=0,
+        ),
+        job=lib.JobSection(
+            input=lib.NodeList(),
+            target="",
+            submit=lib.NodeList(),
+            setup=lib.NodeList(),
+            clean=lib.GlobList(),
+            archive=lib.GlobList(),
+            basedir=sys.intern(basedir),
+            workdir=sys.intern(workdir),
+        ),
+    )
+
+    # get directories containing a Jobfile from the ancestor chain in the
+    # tree index, or walk all directories between basedir and workdir if
+    # the index is not available or stale
+    node_list = lib.GetIndexedNodeList(basedir, workdir)
+
+    if node_list is None:
+        node_list = [(nodedir, None) for nodedir in GetNodeList(basedir, workdir)]
+
+    # walk down the directory tree and extend the merged configuration
+    # of the parent node with the Jobfile of each node. Nodes that have
+    # already been resolved are read from the cache
+    for nodedir, jobfile_stat in node_list:
+
+        if nodedir not in cache:
+            cache[nodedir] = __ExtendJobConfig(
+                config, basedir, nodedir + os.sep + "Jobfile", jobfile_stat
+            )
+
+        config = cache[nodedir]
 
     # perform checks to enforce design constraints for job.input and job.target
-    if config["job"]["input"] and config["job"]["target"]:
+    if config.job.input and config.job.target:
 
-        targetdir = os.path.dirname(config["job"]["target"])
-        inputdir = os.path.dirname(config["job"]["input"][0])
+        targetdir = os.path.dirname(config.job.target)
+        inputdir = os.path.dirname(config.job.input[0])
 
         if len(targetdir) < len(inputdir):
             raise ValueError(
-                f'[jobrunner] job.target: {config["job"]["target"]} should not exist'
+                f"[jobrunner] job.target: {config.job.target} should not exist"
                 + "before job.input is defined in Jobfile"
             )
 
-    for key in config.keys():
-        if key != "instrument":
-            config[key] = SimpleNamespace(**config[key])
+    # create a copy to keep the cached configuration of the node
+    # intact, lists are shared with the cached configuration
+    config = config.copy()
+    config.job.workdir = sys.intern(workdir)
+
+    return config
+
+
+def __ExtendJobConfig(parent_config, basedir, jobfile, jobfile_stat=None):
+    """
+    Extend merged configuration of a parent node
+    with values from the Jobfile of the current node
+
+    Arguments
+    ---------
+    parent_config : JobConfig containing merged configuration
+                    of the parent node
+    basedir       : Base directory
+    jobfile       : Path to Jobfile of the current node
+    jobfile_stat  : Result of os.stat on the Jobfile if already
+                    known from the tree index
+
+    Returns
+    -------
+    config : JobConfig containing merged configuration
+             of the current node
+    """
+    # return configuration of parent node if there is no Jobfile at
+    # this node, use the tree index to avoid probing the filesystem
+    if jobfile_stat is None:
+
+        if lib.QueryTreeIndex(basedir, os.path.dirname(jobfile)) is False:
+            return parent_config
+
+        try:
+            jobfile_stat = os.stat(jobfile)
+        except FileNotFoundError:
+            return parent_config
+
+    # load the parsed Jobfile from the on-disk cache and
+    # parse it again only if it was changed since last run
+    work_dict = lib.LoadJobfileCache(basedir, jobfile, jobfile_stat)
+
+    if work_dict is None:
+        work_dict = __ParseJobfile(jobfile)
+        lib.SaveJobfileCache(basedir, jobfile, jobfile_stat, work_dict)
+
+    # create a copy of parent configuration so that the
+    # merged configuration of parent node remains unchanged
+    config = parent_config.copy()
+
+    # loop over keys in work_dict and merge configuration
+    for key in work_dict:
+
+        if key == "instrument":
+            # check if main dictionary already contains definitions for instrument
+            if config.instrument:
+                raise ValueError(
+                    f"[jobrunner] Found duplicates for {key} in directory tree"
+                )
+
+            # set values if instrument not already set
+            if options.INSTRUMENTS == 1:
+                config.instrument = work_dict[key]
+
+            else:
+                raise NotImplementedError(
+                    "[jobrunner] Not configured with instruments. Please reinstall with releveant options"
+                )
+
+            continue
+
+        # get section of the configuration
+        section = getattr(config, key)
+
+        # loop over subkey and values
+        for subkey, work_obj in work_dict[key].items():
+
+            # test combination of values here to handle exceptions
+            if f"{key}.{subkey}" in [
+                "schedular.command",
+                "schedular.backend",
+                "schedular.max_inflight",
+                "schedular.cores",
+                "schedular.memory",
+                "schedular.gpus",
+                "schedular.timeout",
+                "job.target",
+            ]:
+
+                # check if main dictionary already contains definitions for [key][subkey]
+                # and enforce design requirements
+                if getattr(section, subkey):
+                    raise ValueError(
+                        f"[jobrunner] Found duplicates for {key}.{subkey} in directory tree"
+                    )
+
+                # set values if [key][subkey] not already set
+                setattr(section, subkey, work_obj)
 
-    config = SimpleNamespace(**config)
+            else:
+                # extend list of parent node
+                setattr(section, subkey, getattr(section, subkey).Extend(work_obj))
 
     return config
 
 
+def __ParseJobfile(jobfile):
+    """
+    Parse a Jobfile and resolve paths relative
+    to the location of the Jobfile
+
+    Arguments
+    ---------
+    jobfile : Path to Jobfile
+
+    Returns
+    -------
+    work_dict : Dictionary containing parsed contents of Jobfile
+    """
+    # load the job configuration both toml and yaml formats supported
+    work_dict = __ReadJobfile(jobfile)
+
+    # loop over keys in work_dict, parse configuration and handle exceptions
+    for key in work_dict:
+
+        if key == "instrument":
+            # some checks to enforce design consistency
+            if isinstance(work_dict[key], list):
+                raise ValueError(f"[jobrunner] {key} cannot be a list")
+
+            continue
+
+        # loop over subkey and values
+        for subkey, work_obj in work_dict[key].items():
+
+            # test combination of values here to get absolute path for setup and submit scripts
+            if f"{key}.{subkey}" in [
+                "job.setup",
+                "job.submit",
+                "job.input",
+                "job.archive",
+                "job.clean",
+            ]:
+
+                # convert to a list if single entry
+                if not isinstance(work_obj, list):
+                    raise ValueError(f"[jobrunner] {key}.{subkey} should be a list")
+
+                # set absolute paths
+                work_obj = [
+                    sys.intern(os.path.dirname(jobfile) + os.sep + value)
+                    for value in work_obj
+                ]
+
+                # check paths and raise error as appropriate
+                # for value in work_obj:
+                #    if not os.path.exists(value):
+                #        raise ValueError(f"[jobrunner]: {value} does not exist")
+
+            # absolute path for job.target
+            if f"{key}.{subkey}" in [
+                "job.target",
+            ]:
+                # some checks to enforce design consistency
+                if isinstance(work_obj, list):
+                    raise ValueError(f"[jobrunner] {key}.{subkey} cannot be a list")
+
+                work_obj = sys.intern(os.path.dirname(jobfile) + os.sep + work_obj)
+
+                # check paths and raise error as appropriate
+                # if not os.path.exists(work_obj):
+                #    raise ValueError(f"[jobrunner]: {work_obj} does not exist")
+
+            # some checks to enforce design consistency
+            if f"{key}.{subkey}" in [
+                "schedular.command",
+                "schedular.backend",
+            ]:
+                if isinstance(work_obj, list):
+                    raise ValueError(f"[jobrunner] {key}.{subkey} cannot be a list")
+
+            if f"{key}.{subkey}" in [
+                "schedular.max_inflight",
+                "schedular.cores",
+                "schedular.gpus",
+            ]:
+                if isinstance(work_obj, bool) or not isinstance(work_obj, int):
+                    raise ValueError(f"[jobrunner] {key}.{subkey} should be an integer")
+
+                if subkey == "gpus" and work_obj < 0:
+                    raise ValueError(
+                        f"[jobrunner] {key}.{subkey} should not be negative"
+                    )
+
+                if subkey != "gpus" and work_obj < 1:
+                    raise ValueError(f"[jobrunner] {key}.{subkey} should be positive")
+
+            # memory in MB, strings with units are converted
+            if f"{key}.{subkey}" in [
+                "schedular.memory",
+            ]:
+                work_obj = __ParseMemory(f"{key}.{subkey}", work_obj)
+
+            # timeout in seconds, strings with units or clock format are converted
+            if f"{key}.{subkey}" in [
+                "schedular.timeout",
+            ]:
+                work_obj = __ParseTimeout(f"{key}.{subkey}", work_obj)
+
+            work_dict[key][subkey] = work_obj
+
+    return work_dict
+
+
+def __ParseMemory(name, value):
+    """
+    Convert memory given as an integer in MB or a
+    string with K, M, G or T units to an integer in MB
+
+    Arguments
+    ---------
+    name  : Name of the configuration variable
+    value : Value from Jobfile
+
+    Returns
+    -------
+    memory : Memory in MB
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        memory = value
+
+    elif isinstance(value, str) and __MemoryValue.match(value.strip()):
+        number, unit = __MemoryValue.match(value.strip()).groups()
+        memory = int(float(number) * __MemoryUnits[unit.upper() if unit else "M"])
+
+    else:
+        raise ValueError(
+            f'[jobrunner] {name} should be an integer in MB or a string like "4G"'
+        )
+
+    if memory < 1:
+        raise ValueError(f"[jobrunner] {name} should be positive")
+
+    return memory
+
+
+def __ParseTimeout(name, value):
+    """
+    Convert wall-clock limit given as a number of seconds, a string
+    with s, m, h or d units, or a string like "HH:MM:SS" to seconds
+
+    Arguments
+    ---------
+    name  : Name of the configuration variable
+    value : Value from Jobfile
+
+    Returns
+    -------
+    timeout : Wall-clock limit in seconds
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        timeout = value
+
+    elif isinstance(value, str) and __TimeoutValue.match(value.strip()):
+        number, unit = __TimeoutValue.match(value.strip()).groups()
+        timeout = float(number) * __TimeoutUnits[unit or "s"]
+
+    elif isinstance(value, str) and __TimeoutClock.match(value.strip()):
+        hours, minutes, seconds = __TimeoutClock.match(value.strip()).groups()
+        timeout = int(hours or 0) * 3600 + int(minutes or 0) * 60 + int(seconds)
+
+    else:
+        raise ValueError(
+            f"[jobrunner] {name} should be a number of seconds "
+            + 'or a string like "30m" or "01:30:00"'
+        )
+
+    if timeout <= 0:
+        raise ValueError(f"[jobrunner] {name} should be positive")
+
+    return int(timeout) if timeout == int(timeout) else timeout
+
+
+def __ReadJobfile(jobfile):
+    """
+    Read contents of a Jobfile into a dictionary
+
+    Arguments
+    ---------
+    jobfile : Path to Jobfile
+
+    Returns
+    -------
+    work_dict : Dictionary containing contents of Jobfile
+    """
+    with open(jobfile, "r") as stream:
+        content = stream.read()
+
+    # load the job configuration both toml and yaml formats supported,
+    # detect the format first to select the correct parser on first try
+    if __SniffJobfileFormat(jobfile, content) == "toml":
+        try:
+            return __TomlBackends[__JobfileBackend["toml"]](content)
+
+        # if error fall back to yaml load
+        except Exception:
+            pass
+
+    loader = __YamlBackends[__JobfileBackend["yaml"]](content)
+    loader.name = jobfile
+
+    try:
+        return loader.get_single_data()
+
+    except yaml.YAMLError as exc:
+        print(exc)
+        raise ValueError(f"[jobrunner] Unable to parse {jobfile}")
+
+    finally:
+        loader.dispose()
+
+
+def __SniffJobfileFormat(jobfile, content):
+    """
+    Detect format of a Jobfile using extension or contents
+
+    Arguments
+    ---------
+    jobfile : Path to Jobfile
+    content : Contents of Jobfile
+
+    Returns
+    -------
+    format : "toml" or "yaml"
+    """
+    extension = os.path.splitext(jobfile)[1].lower()
+
+    if extension == ".toml":
+        return "toml"
+
+    if extension in [".yaml", ".yml"]:
+        return "yaml"
+
+    # use the first line that is not a comment, toml files start
+    # with a table header or a key-value pair separated by "="
+    for line in content.splitlines():
+        line = line.strip()
+
+        if not line or line.startswith("#"):
+            continue
+
+        if line.startswith("[") or __TomlKeyValue.match(line):
+            return "toml"
+
+        return "yaml"
+
+    # empty files are valid toml
+    return "toml"
+
+
 def GetNodeList(basedir, workdir, node_object=""):
     """
     Get a list of paths containing an object
@@ -249,9 +601,23 @@ def GetNodeList(basedir, workdir, node_object=""):
         # set object path
         object_path = current_level + os.sep + node_object
 
+        # answer from the tree index when it is fresh, directories
+        # in the index exist and nodes in the index contain a Jobfile
+        object_exists = None
+
+        if node_object in ["", "Jobfile"]:
+            object_exists = lib.QueryTreeIndex(basedir, current_level)
+
+            if object_exists is not None and not node_object:
+                object_exists = True
+
+        # probe the filesystem if index is not available or stale
+        if object_exists is None:
+            object_exists = os.path.exists(object_path)
+
         # append to object_list
         # if path exists
-        if os.path.exists(object_path):
+        if object_exists:
             object_list.append(os.path.abspath(object_path))
 
     return object_list
@@ -0,0 +1,770 @@
+# Standard libraries
+import os
+import sys
+import time
+import signal
+import threading
+import subprocess
+from concurrent import futures
+
+# Local imports
+from jobrunner import lib
+
+
+def BashProcessPool(
+    basedir,
+    workdir_list,
+    script,
+    jobs,
+    verbose=False,
+    exit_on_failure=False,
+    resource_list=None,
+    on_state=None,
+    live=False,
+    timeout_dict=None,
+):
+    """
+    Run bash processes for a list of working directories concurrently
+    using a bounded pool of workers. Output of each process is written
+    to job.output in its working directory and a summary is displayed
+    on console when a process completes
+
+    Arguments
+    ---------
+    basedir         : Base directory (top level) of a project
+    workdir_list    : List of working directories
+    script          : Name of the script in working directory
+    jobs            : Maximum number of concurrent processes
+    verbose         : Display job.output of each process on completion
+    exit_on_failure : Cancel remaining processes if a failure occurs
+    resource_list   : List of (cores, memory) requested by each process,
+                      see BashProcessDag
+    on_state        : Function called with working directory and state
+                      of each process, see BashProcessDag
+    live            : Display output of processes as it is written,
+                      see BashProcessDag
+    timeout_dict    : Dictionary of wall-clock limit in seconds for
+                      working directories, see BashProcessDag
+
+    Returns
+    -------
+    failures : List of working directories with failed processes
+    """
+    return BashProcessDag(
+        basedir,
+        [(workdir, script, None) for workdir in workdir_list],
+        jobs,
+        verbose,
+        exit_on_failure,
+        resource_list,
+        on_state,
+        live,
+        timeout_dict,
+    )
+
+
+def BashProcessDag(
+    basedir,
+    process_list,
+    jobs,
+    verbose=False,
+    exit_on_failure=False,
+    resource_list=None,
+    on_state=None,
+    live=False,
+    timeout_dict=None,
+):
+    """
+    Run bash processes in order of their dependencies using a bounded
+    pool of workers. A process starts when the process it depends on
+    succeeds, and processes that depend on a failed process are skipped.
+    Each process runs in its own process group, which is terminated on
+    timeout, on failure with exit_on_failure or on KeyboardInterrupt
+
+    Arguments
+    ---------
+    basedir         : Base directory (top level) of a project
+    process_list    : List of (workdir, script, parent) for each process,
+                      parent is the index of the process it depends on
+                      or None
+    jobs            : Maximum number of concurrent processes
+    verbose         : Display job.output of each process on completion
+    exit_on_failure : Cancel remaining processes if a failure occurs
+    resource_list   : List of (cores, memory) requested by each process,
+                      memory in MB. If supplied, processes are packed
+                      onto cores and memory available to jobrunner
+                      instead of using jobs, and each process is pinned
+                      to its cores
+    on_state        : Function called with working directory and state
+                      of each process when it is started, succeeded,
+                      failed, skipped or cancelled, calls are made from
+                      the calling thread
+    live            : Display output of processes as it is written, lines
+                      are tagged with the node of the process and shown
+                      at a limited rate. Output of all processes is read
+                      by a single event loop
+    timeout_dict    : Dictionary of wall-clock limit in seconds for
+                      working directories, the process group of a
+                      process that exceeds its limit is terminated
+                      and the process fails
+
+    Returns
+    -------
+    failures : List of working directories with failed processes
+    """
+    # cores and memory available to processes, number of workers
+    # is bounded by number of cores since each process needs one
+    if resource_list is not None:
+        resources = ResourcePool()
+        for cores, memory in resource_list:
+            resources.Check(cores, memory)
+
+        jobs = len(resources.cpus)
+
+    # processes that depend on each process
+    children = [[] for _ in process_list]
+    for index, (workdir, script, parent) in enumerate(process_list):
+        if parent is not None:
+            children[parent].append(index)
+
+    def Descendants(index):
+        """
+        Get processes that depend on a process directly or indirectly
+        """
+        for child in children[index]:
+            yield child
+            yield from Descendants(child)
+
+    # running processes, capture of their output, wall-clock
+    # limits and an event to cancel remaining work
+    process_dict = {}
+    capture_dict = {}
+    limit_dict = {}
+    process_lock = threading.Lock()
+    cancel_event = threading.Event()
+
+    # event loop that reads output of all processes for live display
+    multiplexer = lib.OutputMultiplexer(echo=True) if live else None
+
+    def RunProcess(index, cpus=None):
+        """
+        Run a process and wait for completion, a process with cpus
+        is started from a thread pinned to cpus and inherits them
+        """
+        workdir, script, parent = process_list[index]
+
+        with process_lock:
+            if cancel_event.is_set():
+                return None
+
+            env = None
+            if cpus:
+                env = dict(os.environ, JobCores=str(len(cpus)))
+                resources.Pin(cpus)
+
+            start = time.monotonic()
+            capture_dict[index] = lib.OutputCapture(
+                workdir,
+                multiplexer=multiplexer,
+                tag=os.path.relpath(workdir, basedir),
+            )
+
+            try:
+                with lib.ProfilePhase("launch", workdir):
+                    process_dict[index] = subprocess.Popen(
+                        ["bash", script],
+                        stdout=capture_dict[index].stdout,
+                        stderr=subprocess.STDOUT,
+                        cwd=workdir,
+                        env=env,
+                        start_new_session=True,
+                    )
+
+            finally:
+                if cpus:
+                    resources.Pin(resources.cpus)
+
+            limit_dict[index] = ProcessTimeout(
+                process_dict[index], (timeout_dict or {}).get(workdir)
+            )
+
+        # wait for the process and remaining output to be written
+        with capture_dict[index], limit_dict[index], lib.ProfilePhase(
+            "execute", workdir
+        ):
+            returncode, metrics = WaitProcess(process_dict[index], start)
+
+        lib.WriteJobMetrics(workdir, script, metrics)
+
+        return returncode
+
+    def Notify(index, state):
+        """
+        Report state of a process to on_state
+        """
+        if state != "started":
+            finished.add(index)
+
+        if on_state:
+            on_state(process_list[index][0], state)
+
+    def CancelProcesses():
+        """
+        Cancel processes that have not started and terminate
+        process groups of running processes
+        """
+        with process_lock:
+            cancel_event.set()
+            for pending in future_dict:
+                pending.cancel()
+            for process in process_dict.values():
+                if process.returncode is None:
+                    TerminateProcessGroup(process)
+
+    def StartProcesses():
+        """
+        Start processes that are ready, processes are packed in
+        decreasing order of requested cores and memory if resources
+        are limited and processes that do not fit wait for a release
+        """
+        if resource_list is not None:
+            ready.sort(key=lambda index: resource_list[index], reverse=True)
+
+        for index in list(ready):
+            cpus = None
+
+            if resource_list is not None:
+                cpus = resources.Allocate(*resource_list[index])
+                if cpus is None:
+                    continue
+
+            ready.remove(index)
+            allocation[index] = cpus
+            future_dict[executor.submit(RunProcess, index, cpus)] = index
+            Notify(index, "started")
+
+    if resource_list is None:
+        print(
+            f"\n{lib.Color.purple}EXECUTE:{lib.Color.end} {len(process_list)} jobs "
+            + f"using {jobs} workers"
+        )
+
+    else:
+        print(
+            f"\n{lib.Color.purple}EXECUTE:{lib.Color.end} {len(process_list)} jobs "
+            + f"using {len(resources.cpus)} cores and {resources.memory} MB"
+        )
+
+    failures, skipped, cancelled, timeouts = [], [], [], []
+
+    # processes that reached a final state
+    finished = set()
+    interrupted = False
+
+    # processes that are ready to start and resources allocated to processes
+    ready = [
+        index
+        for index, (workdir, script, parent) in enumerate(process_list)
+        if parent is None
+    ]
+    allocation = {}
+    future_dict = {}
+
+    with futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        with lib.ProgressBar(len(process_list), monitor=True) as bar:
+
+            # cancel remaining work and shut down running processes
+            # on Ctrl-C or SIGTERM, see InterruptOnTerminate
+            try:
+                StartProcesses()
+
+                while future_dict:
+                    done, _ = futures.wait(
+                        future_dict, return_when=futures.FIRST_COMPLETED
+                    )
+
+                    for future in done:
+                        index = future_dict.pop(future)
+                        workdir, script, parent = process_list[index]
+                        returncode = None if future.cancelled() else future.result()
+                        bar()
+
+                        # release resources allocated to the process
+                        if resource_list is not None:
+                            resources.Release(
+                                allocation[index], resource_list[index][1]
+                            )
+
+                        # processes that were cancelled before they started
+                        # or terminated after a failure in another process
+                        if returncode is None or (
+                            returncode != 0 and cancel_event.is_set()
+                        ):
+                            for child in [index, *Descendants(index)]:
+                                cancelled.append(process_list[child][0])
+                                Notify(child, "cancelled")
+                                if child != index:
+                                    bar()
+                            continue
+
+                        nodepath = workdir.replace(basedir, "<ROOT>")
+
+                        if verbose:
+                            lib.ConsoleSeparator()
+                            print(
+                                f"{lib.Color.purple}OUTPUT:{lib.Color.end} {nodepath}"
+                            )
+                            lib.PrintOutputFile(capture_dict[index].outputfile)
+
+                        if returncode != 0:
+                            failures.append(workdir)
+                            Notify(index, "failed")
+
+                            if limit_dict[index].expired:
+                                timeouts.append(workdir)
+                                print(
+                                    f"{lib.Color.red}TIMEOUT {lib.Color.end}{nodepath}/"
+                                    + f"{script} after {limit_dict[index].timeout} seconds"
+                                )
+                            else:
+                                print(
+                                    f"{lib.Color.red}FAILURE {lib.Color.end}{nodepath}/{script}"
+                                )
+
+                            if not verbose:
+                                print(
+                                    "".join(
+                                        line + "\n"
+                                        for line in capture_dict[index].Tail()
+                                    )
+                                )
+
+                            # skip processes that depend on the failed process
+                            for child in Descendants(index):
+                                childpath = process_list[child][0].replace(
+                                    basedir, "<ROOT>"
+                                )
+                                skipped.append(process_list[child][0])
+                                Notify(child, "skipped")
+                                bar()
+                                print(
+                                    f"{lib.Color.red}SKIPPED {lib.Color.end}{childpath}/"
+                                    + f"{process_list[child][1]}"
+                                )
+
+                            # cancel pending work and terminate running processes
+                            if exit_on_failure:
+                                CancelProcesses()
+
+                        else:
+                            print(
+                                f"{lib.Color.green}SUCCESS {lib.Color.end}{nodepath}/{script}"
+                            )
+
+                            Notify(index, "succeeded")
+
+                            # processes that depend on this process are ready
+                            ready.extend(children[index])
+
+                    # start processes that are ready using released resources
+                    StartProcesses()
+
+            except KeyboardInterrupt:
+                interrupted = True
+                CancelProcesses()
+
+    if multiplexer:
+        multiplexer.Close()
+
+    # processes that did not complete before the interrupt
+    if interrupted:
+        for index, (workdir, script, parent) in enumerate(process_list):
+            if index not in finished:
+                cancelled.append(workdir)
+                Notify(index, "cancelled")
+
+    print(
+        f"\n{lib.Color.purple}SUMMARY:{lib.Color.end} "
+        + f"{len(process_list) - len(failures) - len(skipped) - len(cancelled)} "
+        + f"succeeded, {len(failures)} failed ({len(timeouts)} timed out), "
+        + f"{len(skipped)} skipped, {len(cancelled)} cancelled"
+    )
+
+    if interrupted:
+        raise KeyboardInterrupt
+
+    if failures and exit_on_failure:
+        raise ValueError(f"{lib.Color.red}FAILURE {lib.Color.end}")
+
+    return failures
+
+
+class ResourcePool:
+    """
+    Class ResourcePool for cores and memory available to local processes.
+    Cores are given by the CPU affinity of jobrunner, so allocations of a
+    batch schedular are respected, and memory is used to pack processes
+    but is not enforced
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        if hasattr(os, "sched_getaffinity"):
+            self.cpus = sorted(os.sched_getaffinity(0))
+        else:
+            self.cpus = list(range(os.cpu_count()))
+
+        self.memory = self._AvailableMemory()
+
+        self.free_cpus = set(self.cpus)
+        self.free_memory = self.memory
+
+    def Check(self, cores, memory):
+        """
+        Check if a request can be satisfied when all resources are free
+        """
+        if cores > len(self.cpus):
+            raise ValueError(
+                f"[jobrunner] Job requests {cores} cores but only "
+                + f"{len(self.cpus)} are available"
+            )
+
+        if memory > self.memory:
+            raise ValueError(
+                f"[jobrunner] Job requests {memory} MB but only "
+                + f"{self.memory} MB is available"
+            )
+
+    def Allocate(self, cores, memory):
+        """
+        Allocate cores and memory, returns a tuple of CPUs
+        or None if the request does not fit in free resources
+        """
+        if cores > len(self.free_cpus) or memory > self.free_memory:
+            return None
+
+        cpus = tuple(sorted(self.free_cpus)[:cores])
+
+        self.free_cpus.difference_update(cpus)
+        self.free_memory -= memory
+
+        return cpus
+
+    def Release(self, cpus, memory):
+        """
+        Release cores and memory of a process
+        """
+        self.free_cpus.update(cpus)
+        self.free_memory += memory
+
+    def Pin(self, cpus):
+        """
+        Pin the calling thread to a set of CPUs, processes started
+        from the thread inherit its CPU affinity
+        """
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpus)
+
+    @staticmethod
+    def _AvailableMemory():
+        """
+        Get available memory in MB
+        """
+        try:
+            with open("/proc/meminfo", "r") as meminfo:
+                for line in meminfo:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) // 1024
+
+        except OSError:
+            pass
+
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1 << 20)
+
+
+def WaitProcess(process, start, on_stop=None):
+    """
+    Wait for a process to exit and collect resource usage of the
+    process and the descendants it waited for using wait4
+
+    Arguments
+    ---------
+    process : Instance of subprocess.Popen
+    start   : Value of time.monotonic when the process was started
+    on_stop : Function called with process when it is stopped,
+              None to wait only for the process to exit
+
+    Returns
+    -------
+    returncode : Return code of the process
+    metrics    : Dictionary with wall time, CPU time, maximum resident
+                 memory, block I/O and context switches, None if
+                 resource usage is not available
+    """
+    try:
+        pid, status, rusage = os.wait4(process.pid, os.WUNTRACED if on_stop else 0)
+
+        while os.WIFSTOPPED(status):
+            on_stop(process)
+            pid, status, rusage = os.wait4(process.pid, os.WUNTRACED)
+
+    # process was reaped by Popen.poll or wait4 is not supported
+    except (AttributeError, ChildProcessError):
+        process.wait()
+        return process.returncode, None
+
+    # return code is negative signal number if the process was
+    # killed, same as Popen.returncode
+    if os.WIFSIGNALED(status):
+        process.returncode = -os.WTERMSIG(status)
+    else:
+        process.returncode = os.WEXITSTATUS(status)
+
+    # maximum resident memory is in bytes on macOS and kilobytes elsewhere
+    max_rss = rusage.ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+
+    return process.returncode, {
+        "returncode": process.returncode,
+        "finished": round(time.time(), 3),
+        "wall": round(time.monotonic() - start, 3),
+        "user": round(rusage.ru_utime, 3),
+        "sys": round(rusage.ru_stime, 3),
+        "max_rss": round(max_rss, 1),
+        "block_in": rusage.ru_inblock,
+        "block_out": rusage.ru_oublock,
+        "voluntary_switches": rusage.ru_nvcsw,
+        "involuntary_switches": rusage.ru_nivcsw,
+    }
+
+
+def SignalProcessGroup(process, signum):
+    """
+    Send a signal to the process group of a process started
+    in a new session, the process is the leader of the group
+
+    Arguments
+    ---------
+    process : Instance of subprocess.Popen
+    signum  : Signal number, 0 to test if the group exists
+
+    Returns
+    -------
+    delivered : True if the group exists
+    """
+    try:
+        os.killpg(process.pid, signum)
+    except (ProcessLookupError, PermissionError):
+        return False
+
+    return True
+
+
+def TerminateProcessGroup(process, grace=10.0):
+    """
+    Send SIGTERM to the process group of a process and SIGKILL to
+    processes of the group that are still running after a grace
+    period. The grace period is observed by a thread, so the caller
+    is not blocked and jobrunner does not exit before it ends
+
+    Arguments
+    ---------
+    process : Instance of subprocess.Popen
+    grace   : Grace period in seconds
+    """
+    SignalProcessGroup(process, signal.SIGTERM)
+
+    # not a daemon, even if called from a timer thread
+    thread = threading.Thread(
+        target=__KillProcessGroup, args=(process, grace), daemon=False
+    )
+    thread.start()
+
+
+def __KillProcessGroup(process, grace):
+    """
+    Kill process group of a process if it exists after grace period
+    """
+    deadline = time.monotonic() + grace
+
+    while SignalProcessGroup(process, 0):
+        if time.monotonic() >= deadline:
+            SignalProcessGroup(process, signal.SIGKILL)
+            return
+
+        time.sleep(0.1)
+
+
+class ProcessTimeout:
+    """
+    Class ProcessTimeout for a wall-clock limit of a process, the
+    process group is terminated if the process is still running
+    when the limit expires
+    """
+
+    def __init__(self, process, timeout=None):
+        """
+        Constructor, starts a timer if timeout is set
+
+        Arguments
+        ---------
+        process : Instance of subprocess.Popen started in a new session
+        timeout : Wall-clock limit in seconds, None or 0 for no limit
+        """
+        self.process = process
+        self.timeout = timeout
+        self.expired = False
+        self.timer = None
+
+        if timeout:
+            self.timer = threading.Timer(timeout, self.Expire)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def Expire(self):
+        """
+        Terminate process group when the limit expires
+        """
+        if self.process.returncode is None:
+            self.expired = True
+            TerminateProcessGroup(self.process)
+
+    def Cancel(self):
+        """
+        Stop the timer after the process exits
+        """
+        if self.timer:
+            self.timer.cancel()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.Cancel()
+
+
+def GetForegroundTerminal():
+    """
+    Get the terminal on standard input if jobrunner is in its foreground
+    process group, a terminal is only handed over from the main thread
+
+    Returns
+    -------
+    tty : File descriptor of the terminal, None if not available
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return None
+
+    try:
+        tty = sys.stdin.fileno()
+
+        if os.isatty(tty) and os.tcgetpgrp(tty) == os.getpgrp():
+            return tty
+
+    except (AttributeError, ValueError, OSError):
+        pass
+
+    return None
+
+
+def SetForegroundGroup(tty, pgid):
+    """
+    Make a process group the foreground group of a terminal, SIGTTOU is
+    ignored since the caller may be in a background group
+
+    Arguments
+    ---------
+    tty  : File descriptor of the terminal
+    pgid : Process group ID
+    """
+    handler = signal.signal(signal.SIGTTOU, signal.SIG_IGN)
+
+    try:
+        os.tcsetpgrp(tty, pgid)
+    finally:
+        signal.signal(signal.SIGTTOU, handler)
+
+
+def ForegroundProcessGroup(tty=None):
+    """
+    Get a function for preexec_fn of subprocess.Popen that starts a
+    process in a new process group, which becomes the foreground group
+    of the terminal before the process is executed. The process stays
+    in the session of jobrunner and keeps the controlling terminal
+
+    Arguments
+    ---------
+    tty : File descriptor of the terminal, None to not hand it over
+
+    Returns
+    -------
+    preexec : Function executed in the child process
+    """
+
+    def Preexec():
+        os.setpgid(0, 0)
+
+        if tty is not None:
+            SetForegroundGroup(tty, os.getpgrp())
+
+    return Preexec
+
+
+def SuspendForegroundGroup(process, tty):
+    """
+    Suspend jobrunner when the foreground process group of a process is
+    stopped from the terminal with Ctrl-Z, and continue the process in
+    the foreground when jobrunner is continued by the shell
+
+    Arguments
+    ---------
+    process : Instance of subprocess.Popen leading its process group
+    tty     : File descriptor of the terminal
+    """
+    SetForegroundGroup(tty, os.getpgrp())
+    os.killpg(os.getpgrp(), signal.SIGTSTP)
+
+    SetForegroundGroup(tty, process.pid)
+    SignalProcessGroup(process, signal.SIGCONT)
+
+
+def InterruptOnTerminate():
+    """
+    Raise KeyboardInterrupt on SIGTERM, so that termination of
+    jobrunner is handled like Ctrl-C and running processes are
+    shut down gracefully. Handler is installed from main thread
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    def Interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, Interrupt)
+
+
+def FunctionPool(function, args_list, jobs):
+    """
+    Call a function for a list of arguments using a bounded
+    pool of worker threads. Calls run in order on the calling
+    thread when a single worker is requested
+
+    Arguments
+    ---------
+    function  : Function to call
+    args_list : List of argument tuples, one for each call
+    jobs      : Maximum number of concurrent calls
+
+    Returns
+    -------
+    results : List of return values in order of args_list
+    """
+    if jobs == 1:
+        return [function(*args) for args in args_list]
+
+    with futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        future_list = [executor.submit(function, *args) for args in args_list]
+
+    # raise the first exception after all calls have completed
+    return [future.result() for future in future_list]
@@ -0,0 +1,175 @@
+# Standard libraries
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+
+# local imports
+from jobrunner import lib
+
+# state of the profile for this invocation, events are stored as
+# (phase, workdir, thread, start, wall, cpu) with times in seconds
+__ProfileState = {"enabled": False, "origin": 0.0, "events": [], "cprofile": None}
+
+
+def GetProfileDir(basedir):
+    """
+    Get path to the directory with profiles of runs
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+    """
+    return basedir + os.sep + ".jobrunner" + os.sep + "profile"
+
+
+def StartProfile(cprofile=False):
+    """
+    Start recording timings of phases for this invocation
+
+    Arguments
+    ---------
+    cprofile : Also profile function calls on the main thread with cProfile
+    """
+    __ProfileState["enabled"] = True
+    __ProfileState["origin"] = time.perf_counter()
+    __ProfileState["events"] = []
+
+    if cprofile:
+        __ProfileState["cprofile"] = cProfile.Profile()
+        __ProfileState["cprofile"].enable()
+
+
+@contextlib.contextmanager
+def ProfilePhase(phase, workdir=""):
+    """
+    Record wall and CPU time of a phase when profiling is enabled.
+    CPU time is measured for the calling thread so that phases running
+    concurrently on a pool of workers are accounted separately
+
+    Arguments
+    ---------
+    phase   : Name of the phase
+    workdir : Working directory the phase belongs to
+    """
+    if not __ProfileState["enabled"]:
+        yield
+        return
+
+    start = time.perf_counter()
+    cpu_start = time.thread_time()
+
+    try:
+        yield
+
+    finally:
+        __ProfileState["events"].append(
+            (
+                phase,
+                workdir,
+                threading.get_ident(),
+                start - __ProfileState["origin"],
+                time.perf_counter() - start,
+                time.thread_time() - cpu_start,
+            )
+        )
+
+
+def StopProfile(basedir):
+    """
+    Stop recording and write trace.json in Chrome trace event format,
+    summary.txt with totals for each phase and profile.pstats if cProfile
+    was enabled, to a directory under .jobrunner/profile
+
+    Arguments
+    ---------
+    basedir : Base directory (top level) of a project
+
+    Returns
+    -------
+    profiledir : Directory containing the profile
+    """
+    if not __ProfileState["enabled"]:
+        return None
+
+    __ProfileState["enabled"] = False
+
+    profiledir = (
+        GetProfileDir(basedir)
+        + os.sep
+        + time.strftime("%Y%m%d-%H%M%S")
+        + f"-{os.getpid()}"
+    )
+    os.makedirs(profiledir, exist_ok=True)
+
+    events = __ProfileState["events"]
+
+    # complete events with timestamps and durations in microseconds
+    with open(profiledir + os.sep + "trace.json", "w") as tracefile:
+        json.dump(
+            {
+                "displayTimeUnit": "ms",
+                "traceEvents": [
+                    {
+                        "name": phase,
+                        "cat": "jobrunner",
+                        "ph": "X",
+                        "ts": round(start * 1e6, 3),
+                        "dur": round(wall * 1e6, 3),
+                        "pid": os.getpid(),
+                        "tid": thread,
+                        "args": {
+                            "workdir": workdir.replace(basedir, "<ROOT>"),
+                            "cpu_ms": round(cpu * 1e3, 3),
+                        },
+                    }
+                    for phase, workdir, thread, start, wall, cpu in events
+                ],
+            },
+            tracefile,
+        )
+
+    # aggregate count, wall and CPU time for each phase
+    summary_dict = {}
+    for phase, workdir, thread, start, wall, cpu in events:
+        count, total_wall, total_cpu, max_wall = summary_dict.get(phase, (0, 0, 0, 0))
+        summary_dict[phase] = (
+            count + 1,
+            total_wall + wall,
+            total_cpu + cpu,
+            max(max_wall, wall),
+        )
+
+    summary = [
+        f'{"phase":<12}{"count":>8}{"wall (ms)":>14}{"cpu (ms)":>14}{"max (ms)":>14}'
+    ]
+    for phase, (count, total_wall, total_cpu, max_wall) in sorted(
+        summary_dict.items(), key=lambda item: item[1][1], reverse=True
+    ):
+        summary.append(
+            f"{phase:<12}{count:>8}{total_wall*1e3:>14.3f}"
+            + f"{total_cpu*1e3:>14.3f}{max_wall*1e3:>14.3f}"
+        )
+
+    with open(profiledir + os.sep + "summary.txt", "w") as summaryfile:
+        summaryfile.write("\n".join(summary) + "\n")
+
+    # dump statistics of function calls
+    if __ProfileState["cprofile"]:
+        __ProfileState["cprofile"].disable()
+        pstats.Stats(__ProfileState["cprofile"]).dump_stats(
+            profiledir + os.sep + "profile.pstats"
+        )
+        __ProfileState["cprofile"] = None
+
+    print(
+        f"\n{lib.Color.purple}PROFILE:{lib.Color.end} "
+        + f'{profiledir.replace(basedir,"<ROOT>")}'
+    )
+    for line in summary:
+        print(f'{" "*4}{line}')
+
+    return profiledir
@@ -0,0 +1,346 @@
+# Standard libraries
+import os
+import re
+import time
+import getpass
+import subprocess
+
+# local imports
+from jobrunner import lib
+
+
+class SchedularBackend:
+    """
+    Class SchedularBackend for a generic schedular command, job IDs and
+    queue state are not available and array jobs are not supported
+    """
+
+    name = "command"
+
+    # pattern to find job ID in output of the submit command
+    jobid_pattern = None
+
+    # array directive with the environment variable that holds
+    # index of an array member and the index of the first member
+    array_directive = None
+    array_variable = None
+    array_first = 0
+
+    # seconds between queries when waiting for a free slot
+    poll_interval = 30.0
+
+    def __init__(self, command):
+        """
+        Constructor
+
+        Arguments
+        ---------
+        command : Schedular command used to submit scripts
+        """
+        self.command = command
+
+    def Submit(self, basedir, workdir, script):
+        """
+        Submit a script from a working directory
+
+        Arguments
+        ---------
+        basedir : Base directory (top level) of a project
+        workdir : Working directory
+        script  : Name of the script in working directory
+
+        Returns
+        -------
+        jobid : Job ID reported by the schedular, None if not available
+        """
+        print(
+            f'\n{lib.Color.purple}SUBMIT:{lib.Color.end} {workdir.replace(basedir,"<ROOT>")}/{script}'
+        )
+
+        process = subprocess.run(
+            f"{self.command} {script}",
+            shell=True,
+            check=True,
+            cwd=workdir,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+
+        if process.stdout:
+            print(process.stdout.rstrip("\n"))
+
+        jobid = self.ParseJobID(process.stdout)
+
+        if jobid:
+            print(f"{lib.Color.purple}JOBID:{lib.Color.end} {jobid}")
+
+        return jobid
+
+    def ParseJobID(self, output):
+        """
+        Parse job ID from output of the submit command
+        """
+        if self.jobid_pattern is None:
+            return None
+
+        match = re.search(self.jobid_pattern, output or "", re.MULTILINE)
+        return match.group(1) if match else None
+
+    def QueryJobs(self, jobid_list):
+        """
+        Get job IDs from a list that are queued or running
+
+        Arguments
+        ---------
+        jobid_list : List of job IDs
+
+        Returns
+        -------
+        active : Set of job IDs that are queued or running, the queue
+                 state of a generic schedular command is not available
+                 and none of its jobs are reported as active
+        """
+        return set()
+
+    def _QueryCommand(self, command):
+        """
+        Run a query command and return lines of its output
+        """
+        process = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True)
+        return [line.strip() for line in process.stdout.splitlines() if line.strip()]
+
+
+class BashBackend(SchedularBackend):
+    """
+    Class BashBackend for running scripts with bash on the local machine,
+    a script runs to completion when it is submitted so no jobs are in
+    flight and job IDs are not available
+    """
+
+    name = "bash"
+
+    def __init__(
+        self, command, verbose=False, exit_on_failure=False, timeout_dict=None
+    ):
+        """
+        Constructor
+
+        Arguments
+        ---------
+        command         : Schedular command, bash
+        verbose         : Display output of scripts on the console
+        exit_on_failure : Exit when a script fails
+        timeout_dict    : Dictionary of wall-clock limits in seconds
+                          for working directories
+        """
+        super().__init__(command)
+        self.verbose = verbose
+        self.exit_on_failure = exit_on_failure
+        self.timeout_dict = {} if timeout_dict is None else timeout_dict
+
+        # return code of the last script
+        self.returncode = None
+
+    def Submit(self, basedir, workdir, script):
+        self.returncode = lib.BashProcess(
+            basedir,
+            workdir,
+            script,
+            self.verbose,
+            self.exit_on_failure,
+            self.timeout_dict.get(workdir),
+        )
+        return None
+
+
+class SlurmBackend(SchedularBackend):
+    """
+    Class SlurmBackend for sbatch
+    """
+
+    name = "slurm"
+    jobid_pattern = r"Submitted batch job (\d+)"
+    array_directive = "#SBATCH --array={first}-{last}"
+    array_variable = "SLURM_ARRAY_TASK_ID"
+
+    def QueryJobs(self, jobid_list):
+        # members of array jobs are listed as <jobid>_<index>
+        active = {
+            line.split("_")[0]
+            for line in self._QueryCommand(
+                ["squeue", "-h", "-o", "%i", "-u", getpass.getuser()]
+            )
+        }
+        return active.intersection(jobid_list)
+
+
+class PbsBackend(SchedularBackend):
+    """
+    Class PbsBackend for qsub of PBS Pro
+    """
+
+    name = "pbs"
+    jobid_pattern = r"^(\S+)$"
+    array_directive = "#PBS -J {first}-{last}"
+    array_variable = "PBS_ARRAY_INDEX"
+
+    def QueryJobs(self, jobid_list):
+        active = set(self._QueryCommand(["qselect", "-u", getpass.getuser()]))
+        return active.intersection(jobid_list)
+
+
+class LsfBackend(SchedularBackend):
+    """
+    Class LsfBackend for bsub
+    """
+
+    name = "lsf"
+    jobid_pattern = r"Job <(\d+)> is submitted"
+    array_directive = '#BSUB -J "jobrunner[{first}-{last}]"'
+    array_variable = "LSB_JOBINDEX"
+    array_first = 1
+
+    def QueryJobs(self, jobid_list):
+        active = set(self._QueryCommand(["bjobs", "-noheader", "-o", "jobid"]))
+        return active.intersection(jobid_list)
+
+
+class FakeBackend(SchedularBackend):
+    """
+    Class FakeBackend for the local fakesched script, job IDs are process
+    IDs of local processes and a job is active while its process is alive
+    """
+
+    name = "fake"
+    jobid_pattern = r"Submitted batch job (\d+)"
+    array_directive = "#FAKESCHED --array={first}-{last}"
+    array_variable = "FAKESCHED_ARRAY_TASK_ID"
+    poll_interval = 0.5
+
+    def QueryJobs(self, jobid_list):
+        active = set()
+        for jobid in jobid_list:
+            try:
+                os.kill(int(jobid), 0)
+                active.add(jobid)
+            except (ProcessLookupError, ValueError):
+                pass
+            except PermissionError:
+                active.add(jobid)
+        return active
+
+
+# backends by name and schedular commands used to infer them
+__SchedularBackends = {
+    "bash": BashBackend,
+    "slurm": SlurmBackend,
+    "pbs": PbsBackend,
+    "lsf": LsfBackend,
+    "fake": FakeBackend,
+}
+
+__SchedularCommands = {
+    "bash": "bash",
+    "sbatch": "slurm",
+    "qsub": "pbs",
+    "bsub": "lsf",
+    "fakesched": "fake",
+}
+
+
+def GetSchedularBackend(command, name=""):
+    """
+    Get schedular backend for a schedular command
+
+    Arguments
+    ---------
+    command : Schedular command used to submit scripts
+    name    : Name of the backend, inferred from command if empty
+
+    Returns
+    -------
+    backend : Instance of SchedularBackend
+    """
+    if not name:
+        name = __SchedularCommands.get(
+            os.path.basename((command.split() or [""])[0]), ""
+        )
+
+        if not name:
+            return SchedularBackend(command)
+
+    if name not in __SchedularBackends:
+        raise ValueError(
+            f'[jobrunner] Unknown schedular.backend "{name}", available '
+            + f"backends {list(__SchedularBackends.keys())}"
+        )
+
+    return __SchedularBackends[name](command)
+
+
+def SchedularQueue(basedir, backend, submission_list, max_inflight=0, on_submit=None):
+    """
+    Submit scripts using a schedular backend. When max_inflight is set,
+    a submission waits until the number of queued or running jobs from
+    this queue leaves room for it
+
+    Arguments
+    ---------
+    basedir         : Base directory (top level) of a project
+    backend         : Instance of SchedularBackend
+    submission_list : List of (workdir, script, count) for each submission,
+                      count is the number of jobs in the submission
+    max_inflight    : Maximum number of queued or running jobs, 0 to
+                      submit without waiting
+    on_submit       : Function called with working directory and job ID
+                      of each submission once it is submitted
+
+    Returns
+    -------
+    jobid_list : List of job IDs for submissions
+    """
+    if max_inflight and backend.jobid_pattern is None:
+        raise ValueError(
+            f'[jobrunner] Cannot limit jobs in flight for schedular.command "{backend.command}", '
+            + f"set schedular.backend to one of {list(__SchedularBackends.keys())}"
+        )
+
+    # jobs in flight stored as job ID and count
+    inflight = {}
+    jobid_list = []
+
+    for workdir, script, count in submission_list:
+
+        # wait for jobs to leave the queue before submitting
+        if max_inflight and sum(inflight.values()) + count > max_inflight:
+            print(
+                f"\n{lib.Color.purple}WAITING:{lib.Color.end} "
+                + f"{sum(inflight.values())} jobs in flight, limit {max_inflight}"
+            )
+
+            while inflight and sum(inflight.values()) + count > max_inflight:
+                time.sleep(backend.poll_interval)
+                active = backend.QueryJobs(list(inflight))
+                inflight = {
+                    jobid: jobcount
+                    for jobid, jobcount in inflight.items()
+                    if jobid in active
+                }
+
+        with lib.ProfilePhase("submit", workdir):
+            jobid = backend.Submit(basedir, workdir, script)
+        jobid_list.append(jobid)
+
+        if on_submit:
+            on_submit(workdir, jobid)
+
+        if max_inflight:
+            if jobid is None:
+                raise ValueError(
+                    f"[jobrunner] Unable to find job ID in output of "
+                    + f'"{backend.command}", cannot limit jobs in flight'
+                )
+
+            inflight[jobid] = count
+
+    return jobid_list
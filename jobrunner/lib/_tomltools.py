@@ -0,0 +1,208 @@
+# Standard libraries
+import re
+import json
+import math
+import datetime
+
+# Feature libraries
+import toml
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# local imports
+from jobrunner import lib
+
+# merged dictionaries for prefixes of toml file lists, stored by
+# path and digest of each file so that sibling nodes reuse results
+__MergedToml = {}
+
+# pattern for keys that do not need quotes
+__BareKey = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def LoadTomlFile(filename):
+    """
+    Load a toml file into a dictionary
+
+    Arguments
+    ---------
+    filename : Path to toml file
+
+    Returns
+    -------
+    toml_dict : Dictionary containing contents of the file
+    """
+    if tomllib:
+        with open(filename, "rb") as tomlfile:
+            return tomllib.load(tomlfile)
+
+    return toml.load(filename)
+
+
+def DeepMerge(base_dict, node_dict):
+    """
+    Merge two dictionaries, nested tables are merged recursively
+    and other values in node_dict replace values in base_dict.
+    Input dictionaries are not modified and unchanged tables are
+    shared with the result
+
+    Arguments
+    ---------
+    base_dict : Dictionary to merge into
+    node_dict : Dictionary with values to merge
+
+    Returns
+    -------
+    merged_dict : Merged dictionary
+    """
+    merged_dict = dict(base_dict)
+
+    for key, value in node_dict.items():
+        if isinstance(value, dict) and isinstance(merged_dict.get(key), dict):
+            merged_dict[key] = DeepMerge(merged_dict[key], value)
+        else:
+            merged_dict[key] = value
+
+    return merged_dict
+
+
+def MergeTomlFiles(filelist):
+    """
+    Merge a list of toml files in order. Results are memoized for
+    every prefix of the list so that lists sharing ancestor files
+    are merged starting from the longest shared prefix
+
+    Arguments
+    ---------
+    filelist : List of paths to toml files
+
+    Returns
+    -------
+    merged_dict : Merged dictionary, should not be modified
+    """
+    keys = [(filename, lib.GetFileDigest(filename)) for filename in filelist]
+
+    # find the longest prefix that has already been merged
+    start, merged_dict = 0, {}
+    for index in range(len(keys), 0, -1):
+        if tuple(keys[:index]) in __MergedToml:
+            start, merged_dict = index, __MergedToml[tuple(keys[:index])]
+            break
+
+    # merge remaining files and store result for each prefix
+    for index in range(start, len(keys)):
+        merged_dict = DeepMerge(merged_dict, LoadTomlFile(filelist[index]))
+        __MergedToml[tuple(keys[: index + 1])] = merged_dict
+
+    return merged_dict
+
+
+def DumpToml(toml_dict):
+    """
+    Serialize a dictionary to a string in toml format
+
+    Arguments
+    ---------
+    toml_dict : Dictionary to serialize
+
+    Returns
+    -------
+    content : String in toml format
+    """
+    lines = []
+    __DumpTable(toml_dict, [], lines)
+    return "\n".join(lines) + "\n"
+
+
+def __DumpTable(table, prefix, lines):
+    """
+    Append lines for a table, values are written before sub-tables
+    """
+    subtables = []
+
+    for key, value in table.items():
+        if isinstance(value, dict):
+            subtables.append((key, value, False))
+
+        elif (
+            isinstance(value, list)
+            and value
+            and all(isinstance(item, dict) for item in value)
+        ):
+            subtables.append((key, value, True))
+
+        else:
+            lines.append(f"{__DumpKey(key)} = {__DumpValue(value)}")
+
+    for key, value, is_array in subtables:
+        header = ".".join(__DumpKey(name) for name in prefix + [key])
+
+        if is_array:
+            for item in value:
+                lines.extend(["", f"[[{header}]]"])
+                __DumpTable(item, prefix + [key], lines)
+
+        else:
+            lines.extend(["", f"[{header}]"])
+            __DumpTable(value, prefix + [key], lines)
+
+
+def __DumpKey(key):
+    """
+    Serialize a key, keys that are not bare are quoted
+    """
+    key = str(key)
+    return key if __BareKey.match(key) else __DumpString(key)
+
+
+def __DumpString(value):
+    """
+    Serialize a basic string, json escapes quotes, backslashes and
+    control characters below 0x20 but not DEL, which toml requires
+    to be escaped as well
+    """
+    return json.dumps(value, ensure_ascii=False).replace("\x7f", "\\u007f")
+
+
+def __DumpValue(value):
+    """
+    Serialize a value to inline toml format
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+
+    if isinstance(value, str):
+        return __DumpString(value)
+
+    if isinstance(value, int):
+        return str(value)
+
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "nan"
+        if math.isinf(value):
+            return "inf" if value > 0 else "-inf"
+        return repr(value)
+
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(__DumpValue(item) for item in value) + "]"
+
+    if isinstance(value, dict):
+        return (
+            "{"
+            + ", ".join(
+                f"{__DumpKey(key)} = {__DumpValue(item)}" for key, item in value.items()
+            )
+            + "}"
+        )
+
+    raise TypeError(f"[jobrunner] Cannot serialize {value!r} to toml")
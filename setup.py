@@ -52,6 +52,7 @@ setup(
         "jobrunner/scripts/logdiff",
         "jobrunner/scripts/catlog",
         "jobrunner/scripts/catloglast",
+        "jobrunner/scripts/fakesched",
     ],
     package_data={
         "": [